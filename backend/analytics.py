@@ -0,0 +1,161 @@
+"""Pre-aggregated skill-gap statistics per career role.
+
+role_gap_stats holds one document per (role, skill, day) plus an all-time bucket
+(day == "all"). The empty skill name "" carries the number of analyses in that
+bucket, which is the denominator for gap rates.
+"""
+import os
+import asyncio
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Optional
+
+from pymongo import UpdateOne
+
+ALL_TIME = "all"
+TOTAL = ""
+PRIORITIES = ["High", "Medium", "Low"]
+
+
+def _stat_id(role_id: str, skill: str, day: str) -> str:
+    return f"{role_id}|{skill}|{day}"
+
+
+def _day(value) -> str:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d")
+
+
+async def record_gap_analysis(db, analysis: dict):
+    """Fold one new gap analysis into the running aggregates (one round trip)."""
+    role_id = analysis["career_role_id"]
+    ops = []
+    for day in [_day(analysis["created_at"]), ALL_TIME]:
+        ops.append(UpdateOne(
+            {"_id": _stat_id(role_id, TOTAL, day)},
+            {"$inc": {"count": 1}, "$setOnInsert": {"role_id": role_id, "skill": TOTAL, "day": day}},
+            upsert=True
+        ))
+        for gap in analysis["skill_gaps"]:
+            ops.append(UpdateOne(
+                {"_id": _stat_id(role_id, gap["skill"], day)},
+                {
+                    "$inc": {"count": 1, "gap_sum": gap["gap"], f"priority.{gap['priority']}": 1},
+                    "$set": {"category": gap["category"]},
+                    "$setOnInsert": {"role_id": role_id, "skill": gap["skill"], "day": day}
+                },
+                upsert=True
+            ))
+    await db.role_gap_stats.bulk_write(ops, ordered=False)
+
+
+async def role_gap_summary(db, role_id: str, days: Optional[int] = None) -> dict:
+    """Most common gaps for a role, all-time or over the last `days` days."""
+    if days is None:
+        day_filter = ALL_TIME
+    else:
+        today = datetime.now(timezone.utc)
+        day_filter = {"$gte": (today - timedelta(days=days - 1)).strftime("%Y-%m-%d"), "$lte": today.strftime("%Y-%m-%d")}
+
+    analyses = 0
+    skills = {}
+    async for doc in db.role_gap_stats.find({"role_id": role_id, "day": day_filter}, {"_id": 0}):
+        if doc["skill"] == TOTAL:
+            analyses += doc["count"]
+            continue
+        stat = skills.setdefault(doc["skill"], {
+            "skill": doc["skill"], "category": doc.get("category"), "gap_count": 0, "gap_sum": 0,
+            "priority": {p: 0 for p in PRIORITIES}
+        })
+        stat["gap_count"] += doc["count"]
+        stat["gap_sum"] += doc.get("gap_sum", 0)
+        for priority, count in doc.get("priority", {}).items():
+            stat["priority"][priority] = stat["priority"].get(priority, 0) + count
+
+    results = []
+    for stat in skills.values():
+        gap_sum = stat.pop("gap_sum")
+        stat["mean_gap"] = round(gap_sum / stat["gap_count"], 2) if stat["gap_count"] else 0
+        stat["gap_rate"] = round(stat["gap_count"] / analyses, 4) if analyses else 0
+        results.append(stat)
+    results.sort(key=lambda s: s["gap_count"], reverse=True)
+    return {"role_id": role_id, "days": days, "analyses": analyses, "skills": results}
+
+
+def _rebuild_pipeline(rebuilt_at: datetime) -> list:
+    """One pass over gap_analyses producing every (role, skill, day) and all-time bucket."""
+    entry = {"skill": "$$g.skill", "gap": "$$g.gap", "priority": "$$g.priority", "category": "$$g.category"}
+    group = {
+        "_id": {"role": "$role", "skill": "$entries.skill", "day": "$days"},
+        "count": {"$sum": 1},
+        "gap_sum": {"$sum": "$entries.gap"},
+        "category": {"$last": "$entries.category"},
+    }
+    for priority in PRIORITIES:
+        group[priority] = {"$sum": {"$cond": [{"$eq": ["$entries.priority", priority]}, 1, 0]}}
+    is_total = {"$eq": ["$_id.skill", TOTAL]}
+
+    return [
+        {"$match": {"career_role_id": {"$type": "string"}, "created_at": {"$ne": None}}},
+        {"$project": {
+            "role": "$career_role_id",
+            "days": [{"$dateToString": {"format": "%Y-%m-%d", "date": {"$toDate": "$created_at"}}}, ALL_TIME],
+            # The empty skill counts the analysis itself; each gap adds one entry per skill.
+            "entries": {"$concatArrays": [
+                [{"skill": TOTAL}],
+                {"$map": {"input": {"$ifNull": ["$skill_gaps", []]}, "as": "g", "in": entry}}
+            ]},
+        }},
+        {"$unwind": "$days"},
+        {"$unwind": "$entries"},
+        {"$group": group},
+        {"$project": {
+            "_id": {"$concat": ["$_id.role", "|", "$_id.skill", "|", "$_id.day"]},
+            "role_id": "$_id.role",
+            "skill": "$_id.skill",
+            "day": "$_id.day",
+            "count": 1,
+            "gap_sum": {"$cond": [is_total, "$$REMOVE", "$gap_sum"]},
+            "category": {"$cond": [is_total, "$$REMOVE", "$category"]},
+            "priority": {"$cond": [is_total, "$$REMOVE", {p: f"${p}" for p in PRIORITIES}]},
+            "rebuilt_at": {"$literal": rebuilt_at},
+        }},
+        {"$merge": {"into": "role_gap_stats", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+
+async def rebuild(db) -> int:
+    """Recompute role_gap_stats from gap_analyses in a single aggregation.
+
+    Buckets are replaced in place rather than deleted first, so the endpoint keeps
+    serving complete numbers during a rebuild; afterwards only buckets this run did not
+    produce are removed. An analysis recorded while its own bucket is being replaced can
+    still be lost from that bucket, so run this when traffic is low.
+    """
+    await db.role_gap_stats.create_index([("role_id", 1), ("day", 1)])
+    now = datetime.now(timezone.utc)
+    rebuilt_at = now.replace(microsecond=now.microsecond // 1000 * 1000)  # BSON dates keep milliseconds
+    await db.gap_analyses.aggregate(_rebuild_pipeline(rebuilt_at), allowDiskUse=True).to_list(None)
+    # Past days only change through rebuilds, so any of them not produced now is stale; today's and
+    # all-time buckets created by live writes since the scan carry no stamp and are kept.
+    await db.role_gap_stats.delete_many({
+        "rebuilt_at": {"$ne": rebuilt_at},
+        "$or": [{"day": {"$lt": _day(rebuilt_at)}}, {"rebuilt_at": {"$exists": True}}]
+    })
+    return await db.role_gap_stats.count_documents({"skill": TOTAL, "day": ALL_TIME, "rebuilt_at": rebuilt_at})
+
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    n_roles = await rebuild(client[os.environ['DB_NAME']])
+    print(f"Rebuilt skill-gap analytics for {n_roles} roles")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,198 @@
+"""Read-only catalog snapshot shared by all uvicorn workers through mmap.
+
+Layout (little endian):
+    header    magic(8) format(u32) generation(u64) section_count(u32)
+    directory section_count x [name(16) offset(u64) count(u32)]
+    section   count x [key_off(u64) key_len(u32) val_off(u64) val_len(u32)], sorted by key,
+              followed by the key and value bytes
+
+Values are pre-encoded JSON, so a lookup is a binary search over the mapped index
+plus one slice; nothing is deserialized per worker.
+"""
+import os
+import json
+import mmap
+import time
+import struct
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+MAGIC = b"SGSNAP\x00\x00"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIQI")
+DIRECTORY_ENTRY = struct.Struct("<16sQI")
+INDEX_ENTRY = struct.Struct("<QIQI")
+LIST_LIMIT = 100  # matches the to_list(100) cap of the Mongo-backed endpoints
+
+logger = logging.getLogger(__name__)
+
+
+def encode(value) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def build_sections(roles: list, resources: list) -> Dict[str, Dict[bytes, bytes]]:
+    """Pre-render every lookup the catalog endpoints serve."""
+    resources_by: Dict[Tuple[str, str], list] = {}
+    for res in resources:
+        # Indexed under both display names and canonical skill ids.
+        for skill in {"", *res.get("skills", []), *res.get("skill_ids", [])}:
+            for difficulty in {"", res.get("difficulty", "")}:
+                resources_by.setdefault((skill, difficulty), []).append(res)
+
+    return {
+        "roles": {r["id"].encode(): encode(r) for r in roles},
+        "roles_list": {b"": encode(roles[:LIST_LIMIT])},
+        "resources": {r["id"].encode(): encode(r) for r in resources},
+        "resources_by": {
+            f"{skill}\x00{difficulty}".encode(): encode(items[:LIST_LIMIT])
+            for (skill, difficulty), items in resources_by.items()
+        },
+    }
+
+
+def write_snapshot(path: Path, sections: Dict[str, Dict[bytes, bytes]], generation: Optional[int] = None):
+    """Write a snapshot next to `path` and atomically rename it into place."""
+    generation = generation if generation is not None else time.time_ns()
+    body = bytearray()
+    directory = []
+    base = HEADER.size + DIRECTORY_ENTRY.size * len(sections)
+
+    for name, entries in sections.items():
+        section_offset = base + len(body)
+        keys = sorted(entries)
+        data_offset = section_offset + INDEX_ENTRY.size * len(keys)
+        index = bytearray()
+        data = bytearray()
+        for key in keys:
+            value = entries[key]
+            key_off = data_offset + len(data)
+            data += key
+            val_off = data_offset + len(data)
+            data += value
+            index += INDEX_ENTRY.pack(key_off, len(key), val_off, len(value))
+        body += index + data
+        directory.append(DIRECTORY_ENTRY.pack(name.encode()[:16], section_offset, len(keys)))
+
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, generation, len(sections)))
+        f.write(b"".join(directory))
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Snapshot:
+    """One mapped snapshot file. Lookups return copies, so the map can be dropped safely."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            if self.stat.st_size < HEADER.size:
+                raise ValueError(f"Truncated catalog snapshot {path}")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.generation, count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported catalog snapshot {path}")
+        if HEADER.size + count * DIRECTORY_ENTRY.size > len(self.map):
+            raise ValueError(f"Truncated catalog snapshot {path}")
+        self.sections: Dict[str, Tuple[int, int]] = {}
+        for i in range(count):
+            name, offset, entries = DIRECTORY_ENTRY.unpack_from(self.map, HEADER.size + i * DIRECTORY_ENTRY.size)
+            if offset + entries * INDEX_ENTRY.size > len(self.map):
+                raise ValueError(f"Truncated catalog snapshot {path}")
+            self.sections[name.rstrip(b"\x00").decode()] = (offset, entries)
+
+    def get(self, section: str, key: bytes) -> Optional[bytes]:
+        if section not in self.sections:
+            return None
+        offset, count = self.sections[section]
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_off, key_len, val_off, val_len = INDEX_ENTRY.unpack_from(self.map, offset + mid * INDEX_ENTRY.size)
+            probe = self.map[key_off:key_off + key_len]
+            if probe == key:
+                return self.map[val_off:val_off + val_len]
+            if probe < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+
+class CatalogSnapshot:
+    """Process-wide handle that swaps to a newer snapshot file when one is published."""
+
+    def __init__(self, path: Path, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._current: Optional[Snapshot] = None
+        self._checked_at = 0.0
+        self._rejected: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[Snapshot]:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._reload_if_changed()
+        return self._current
+
+    def _reload_if_changed(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        current = self._current
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if (current and (current.stat.st_ino, current.stat.st_mtime_ns) == version) or version == self._rejected:
+            return
+        try:
+            snapshot = Snapshot(self.path)
+        except (OSError, ValueError, struct.error):
+            # Keep serving the previous snapshot (or Mongo) and log each bad file once.
+            self._rejected = version
+            logger.exception("Ignoring unreadable catalog snapshot %s", self.path)
+            return
+        with self._lock:
+            # A plain reference swap: requests holding the old Snapshot finish on it.
+            self._current = snapshot
+
+    def get(self, section: str, key: str) -> Optional[bytes]:
+        snapshot = self.current()
+        return snapshot.get(section, key.encode()) if snapshot else None
+
+    def get_json(self, section: str, key: str):
+        raw = self.get(section, key)
+        return json.loads(raw) if raw is not None else None
+
+
+async def publish(db, path: Path):
+    roles = await db.career_roles.find({}, {"_id": 0}).to_list(None)
+    resources = await db.resources.find({}, {"_id": 0}).to_list(None)
+    sections = build_sections(roles, resources)
+    await asyncio.to_thread(write_snapshot, path, sections)
+    return len(roles), len(resources)
+
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    root_dir = Path(__file__).parent
+    load_dotenv(root_dir / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    path = Path(os.environ.get('CATALOG_SNAPSHOT', root_dir / 'catalog.snap'))
+    n_roles, n_resources = await publish(client[os.environ['DB_NAME']], path)
+    print(f"Published catalog snapshot {path} with {n_roles} roles and {n_resources} resources")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
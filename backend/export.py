@@ -0,0 +1,110 @@
+"""Streaming NDJSON/CSV export of history collections.
+
+Rows are read from a Motor cursor in bounded batches and yielded in ~64 KB chunks;
+StreamingResponse awaits each send, so a slow client slows the cursor down instead
+of letting rows pile up in memory. LLM text stored by reference is expanded one
+batch at a time.
+"""
+import io
+import csv
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from llm_texts import TEXT_FIELDS, expand_texts
+
+EXPORT_FIELDS = {
+    "assessments": ["id", "user_id", "career_role_id", "skills", "created_at"],
+    "gap_analyses": ["id", "user_id", "career_role_id", "skill_gaps", "readiness_score", "ai_insights", "ai_insights_ref",
+                     "created_at"],
+    "roadmaps": ["id", "user_id", "career_role_id", "roadmap_items", "total_duration", "ai_recommendations",
+                 "ai_recommendations_ref", "created_at"],
+    "progress": ["id", "user_id", "career_role_id", "skill_progress", "overall_progress", "updated_at"],
+}
+EXPORT_TIME_FIELDS = {"assessments": "created_at", "gap_analyses": "created_at", "roadmaps": "created_at", "progress": "updated_at"}
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CURSOR_BATCH_SIZE = 500
+USER_CHUNK_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=_json_default, separators=(",", ":"))
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def stream_export(collection, query: dict, fields: List[str], fmt: str, sort: str = "_id",
+                        header: bool = True) -> AsyncIterator[bytes]:
+    projection = {"_id": 0, **{f: 1 for f in fields}}
+    cursor = collection.find(query, projection).sort(sort, 1).batch_size(CURSOR_BATCH_SIZE)
+    text_field = TEXT_FIELDS.get(collection.name)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore") if fmt == "csv" else None
+    if writer and header:
+        writer.writeheader()
+
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) < CURSOR_BATCH_SIZE:
+            continue
+        for chunk in await _write_batch(collection, batch, text_field, fields, writer, buffer):
+            yield chunk
+        batch = []
+    for chunk in await _write_batch(collection, batch, text_field, fields, writer, buffer, final=True):
+        yield chunk
+
+
+async def stream_export_for_users(collection, users, user_query: dict, query: dict, fields: List[str], fmt: str,
+                                  sort: str) -> AsyncIterator[bytes]:
+    """Export the documents of the users matching user_query, one bounded chunk of user ids at a time.
+
+    A single $in over every matching id would grow with the user base (and hits the BSON
+    size limit for large institutions); chunks keep memory and query size flat.
+    """
+    ids, first = [], True
+    async for user in users.find(user_query, {"_id": 0, "id": 1}).batch_size(USER_CHUNK_SIZE):
+        ids.append(user["id"])
+        if len(ids) < USER_CHUNK_SIZE:
+            continue
+        async for chunk in stream_export(collection, {**query, "user_id": {"$in": ids}}, fields, fmt, sort, header=first):
+            yield chunk
+        ids, first = [], False
+    if ids or first:
+        async for chunk in stream_export(collection, {**query, "user_id": {"$in": ids}}, fields, fmt, sort, header=first):
+            yield chunk
+
+
+async def _write_batch(collection, batch: List[dict], text_field: Optional[str], fields: List[str], writer, buffer,
+                       final: bool = False) -> List[bytes]:
+    if text_field and batch:
+        # Documents migrated to llm_texts only hold the reference; older ones keep the text inline.
+        await expand_texts(collection.database, batch, text_field)
+    chunks = []
+    for doc in batch:
+        if writer:
+            writer.writerow({f: _csv_value(doc.get(f)) for f in fields})
+        else:
+            buffer.write(json.dumps(doc, default=_json_default, separators=(",", ":")))
+            buffer.write("\n")
+        if buffer.tell() >= CHUNK_SIZE:
+            chunks.append(_drain(buffer))
+    if final and buffer.tell():
+        chunks.append(_drain(buffer))
+    return chunks
+
+
+def _drain(buffer: io.StringIO) -> bytes:
+    data = buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+    return data
@@ -0,0 +1,90 @@
+"""Idempotency-Key support for AI-backed POST endpoints.
+
+The first request with a key claims it by inserting an in_progress record with a
+lease; retries with the same key and request either get the stored response or wait
+for the original to finish. Records expire through a TTL index on expires_at.
+"""
+import json
+import asyncio
+import hashlib
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
+
+KEY_TTL = timedelta(hours=24)
+LEASE = timedelta(seconds=120)  # longer than the slowest LLM call we expect
+POLL_INTERVAL = 0.25
+MAX_KEY_LENGTH = 255
+
+
+def fingerprint(params: dict) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def record_id(user_id: str, route: str, key: str) -> str:
+    return f"{user_id}:{route}:{key}"
+
+
+async def key_exists(db, user_id: str, route: str, key: str) -> bool:
+    """Whether a retry with this key would be replayed or wait for the original, not run the handler."""
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return False
+    return await db.idempotency_keys.find_one({"_id": record_id(user_id, route, key)}, {"_id": 1}) is not None
+
+
+async def run_idempotent(db, user_id: str, route: str, key: str, params: dict,
+                         handler: Callable[[], Awaitable[BaseModel]]):
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+    key_id = record_id(user_id, route, key)
+    request_hash = fingerprint(params)
+
+    while True:
+        now = datetime.now(timezone.utc)
+        try:
+            await db.idempotency_keys.insert_one({
+                "_id": key_id,
+                "request_hash": request_hash,
+                "status": "in_progress",
+                "locked_until": now + LEASE,
+                "expires_at": now + KEY_TTL
+            })
+            break
+        except DuplicateKeyError:
+            pass
+
+        record = await db.idempotency_keys.find_one({"_id": key_id})
+        if record is None:
+            continue  # expired or released between our insert and read; try to claim again
+        if record["request_hash"] != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        if record["status"] == "done":
+            return record["response"]
+
+        locked_until = record["locked_until"]
+        if locked_until.tzinfo is None:
+            locked_until = locked_until.replace(tzinfo=timezone.utc)
+        if locked_until < now:
+            # The original request died without finishing; take over its lease.
+            taken = await db.idempotency_keys.find_one_and_update(
+                {"_id": key_id, "status": "in_progress", "locked_until": record["locked_until"]},
+                {"$set": {"locked_until": now + LEASE}}
+            )
+            if taken:
+                break
+        await asyncio.sleep(POLL_INTERVAL)
+
+    try:
+        result = await handler()
+    except BaseException:
+        # Failed requests leave nothing behind, so the client can retry with the same key.
+        await db.idempotency_keys.delete_one({"_id": key_id, "status": "in_progress"})
+        raise
+    await db.idempotency_keys.update_one(
+        {"_id": key_id},
+        {"$set": {"status": "done", "response": result.model_dump(mode="json")}}
+    )
+    return result
@@ -0,0 +1,183 @@
+"""Model routing, prompt budgeting and usage accounting for LLM calls.
+
+Each call picks a model tier from the first matching routing rule, trims the prompt
+to the tier's token budget, and records latency and token counts per call and per
+user. Token counts are estimated at ~4 characters per token, since the chat client
+returns plain text without usage metadata.
+
+Tiers and rules can be overridden with the LLM_MODEL_TIERS and LLM_ROUTING_RULES
+environment variables (JSON in the same shape as the defaults below).
+"""
+import os
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+from tracing import span
+
+CHARS_PER_TOKEN = 4
+
+DEFAULT_TIERS = {
+    "fast": {"provider": "openai", "model": "gpt-5-mini", "max_prompt_tokens": 1500,
+             "prompt_cost_per_1k": 0.00025, "completion_cost_per_1k": 0.002},
+    "standard": {"provider": "openai", "model": "gpt-5.2", "max_prompt_tokens": 6000,
+                 "prompt_cost_per_1k": 0.00175, "completion_cost_per_1k": 0.014},
+}
+
+# Evaluated in order; every condition present must hold. The last rule is the fallback.
+DEFAULT_RULES = [
+    {"route": "analysis/gap", "max_gaps": 3, "max_prompt_tokens": 1200, "tier": "fast"},
+    {"route": "roadmap/generate", "max_gaps": 3, "max_total_gap": 6, "tier": "fast"},
+    {"tier": "standard"},
+]
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    name: str
+    provider: str
+    model: str
+    max_prompt_tokens: int
+    prompt_cost_per_1k: float = 0.0
+    completion_cost_per_1k: float = 0.0
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def trim_prompt(prompt: str, max_tokens: int, optional: Iterable[str] = ()) -> str:
+    """Fit the prompt to max_tokens by dropping list items ("- ..."), never the text around them.
+
+    Items in `optional` go first. After that every list loses items from its end in
+    proportion to its length, and each trimmed list ends with a note saying how many
+    items were left out. A prompt that cannot fit is returned with all lists trimmed.
+    """
+    budget = max_tokens * CHARS_PER_TOKEN
+    if len(prompt) <= budget:
+        return prompt
+    lines = prompt.split("\n")
+    lists: List[List[int]] = []
+    for i, line in enumerate(lines):
+        if line.startswith("- "):
+            if lists and lists[-1][-1] == i - 1:
+                lists[-1].append(i)
+            else:
+                lists.append([i])
+    dropped = set()
+
+    def render() -> str:
+        out = []
+        for i, line in enumerate(lines):
+            if i not in dropped:
+                out.append(line)
+            for items in lists:
+                if i == items[-1]:
+                    omitted = sum(1 for j in items if j in dropped)
+                    if omitted:
+                        out.append(f"- ... {omitted} more omitted")
+        return "\n".join(out)
+
+    optional = set(optional)
+    for i in reversed([i for items in lists for i in items if lines[i] in optional]):
+        if len(render()) <= budget:
+            return render()
+        dropped.add(i)
+
+    while len(render()) > budget:
+        kept = [[i for i in items if i not in dropped] for items in lists]
+        candidates = [(len(k) / len(items), len(k), n) for n, (k, items) in enumerate(zip(kept, lists)) if k]
+        if not candidates:
+            break
+        # The list with the largest share still kept loses its last item.
+        _, _, n = max(candidates)
+        dropped.add(kept[n][-1])
+    return render()
+
+
+class LlmRouter:
+    def __init__(self, tiers: Optional[Dict[str, dict]] = None, rules: Optional[List[dict]] = None):
+        tiers = tiers or json.loads(os.environ.get('LLM_MODEL_TIERS', 'null')) or DEFAULT_TIERS
+        self.tiers = {name: ModelTier(name=name, **spec) for name, spec in tiers.items()}
+        self.rules = rules or json.loads(os.environ.get('LLM_ROUTING_RULES', 'null')) or DEFAULT_RULES
+
+    def choose(self, route: str, prompt_tokens: int, gaps: int, total_gap: int) -> ModelTier:
+        for rule in self.rules:
+            if rule.get("route", route) != route:
+                continue
+            if prompt_tokens > rule.get("max_prompt_tokens", prompt_tokens):
+                continue
+            if gaps > rule.get("max_gaps", gaps) or total_gap > rule.get("max_total_gap", total_gap):
+                continue
+            return self.tiers[rule["tier"]]
+        return self.tiers[self.rules[-1]["tier"]]
+
+    async def send(self, db, route: str, user_id: str, session_id: str, system_message: str, prompt: str,
+                   skill_gaps: List[dict], optional_lines: Iterable[str] = ()) -> str:
+        """Send through the routed tier. optional_lines are prompt list items to drop first when trimming."""
+        tier = self.choose(route, estimate_tokens(prompt), len(skill_gaps), sum(g["gap"] for g in skill_gaps))
+        prompt = trim_prompt(prompt, tier.max_prompt_tokens, optional_lines)
+        chat = LlmChat(
+            api_key=os.environ.get('EMERGENT_LLM_KEY'),
+            session_id=session_id,
+            system_message=system_message
+        ).with_model(tier.provider, tier.model)
+
+        with span("llm.send_message"):
+            started = time.perf_counter()
+            response = await chat.send_message(UserMessage(text=prompt))
+            latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        with span("mongo.llm_usage.record"):
+            await self.record(db, route, tier, user_id, latency_ms, estimate_tokens(system_message + prompt), estimate_tokens(response))
+        return response
+
+    async def record(self, db, route: str, tier: ModelTier, user_id: str, latency_ms: float,
+                     prompt_tokens: int, completion_tokens: int):
+        cost = prompt_tokens / 1000 * tier.prompt_cost_per_1k + completion_tokens / 1000 * tier.completion_cost_per_1k
+        now = datetime.now(timezone.utc)
+        await db.llm_usage.insert_one({
+            "route": route,
+            "tier": tier.name,
+            "model": tier.model,
+            "user_id": user_id,
+            "latency_ms": latency_ms,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost": cost,
+            "created_at": now
+        })
+        await db.llm_usage_totals.update_one(
+            {"_id": user_id},
+            {"$inc": {"calls": 1, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "cost": cost},
+             "$set": {"updated_at": now}},
+            upsert=True
+        )
+
+
+async def usage_report(db, days: int) -> List[dict]:
+    """Latency, tokens and cost per (route, tier) over the last `days` days."""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    pipeline = [
+        {"$match": {"created_at": {"$gte": since}}},
+        {"$group": {
+            "_id": {"route": "$route", "tier": "$tier", "model": "$model"},
+            "calls": {"$sum": 1},
+            "avg_latency_ms": {"$avg": "$latency_ms"},
+            "max_latency_ms": {"$max": "$latency_ms"},
+            "prompt_tokens": {"$sum": "$prompt_tokens"},
+            "completion_tokens": {"$sum": "$completion_tokens"},
+            "cost": {"$sum": "$cost"},
+        }},
+        {"$sort": {"_id.route": 1, "_id.tier": 1}},
+    ]
+    report = []
+    async for row in db.llm_usage.aggregate(pipeline):
+        key = row.pop("_id")
+        row["avg_latency_ms"] = round(row["avg_latency_ms"], 1)
+        row["cost"] = round(row["cost"], 6)
+        report.append({**key, **row})
+    return report
@@ -0,0 +1,148 @@
+"""Content-addressed, compressed storage for LLM-generated text.
+
+gap_analyses and roadmaps keep only `<field>_ref` (the sha256 of the text); the text
+itself lives once in llm_texts no matter how many documents share it.
+"""
+import os
+import zlib
+import asyncio
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from bson import Binary
+from pymongo import UpdateOne
+
+TEXT_FIELDS = {"gap_analyses": "ai_insights", "roadmaps": "ai_recommendations"}
+CACHE_SIZE = 1024
+
+_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _remember(digest: str, text: str):
+    _cache[digest] = text
+    _cache.move_to_end(digest)
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def _text_doc(digest: str, raw: bytes) -> dict:
+    data = zlib.compress(raw, 9)
+    return {
+        "_id": digest,
+        "data": Binary(data),
+        "size": len(raw),
+        "stored_size": len(data),
+        "created_at": datetime.now(timezone.utc)
+    }
+
+
+async def store_text(db, text: str) -> str:
+    """Store text once and return its reference."""
+    digest = text_hash(text)
+    if digest not in _cache:
+        await db.llm_texts.update_one(
+            {"_id": digest},
+            {"$setOnInsert": _text_doc(digest, text.encode("utf-8"))},
+            upsert=True
+        )
+        _remember(digest, text)
+    return digest
+
+
+async def store_texts(db, texts: List[str]) -> Dict[str, str]:
+    """Store many texts in one bulk write and return {text: reference}."""
+    refs = {text: text_hash(text) for text in texts}
+    if refs:
+        await db.llm_texts.bulk_write([
+            UpdateOne({"_id": digest}, {"$setOnInsert": _text_doc(digest, text.encode("utf-8"))}, upsert=True)
+            for text, digest in refs.items()
+        ], ordered=False)
+    return refs
+
+
+async def load_texts(db, digests: List[str]) -> Dict[str, str]:
+    found = {d: _cache[d] for d in digests if d in _cache}
+    missing = [d for d in set(digests) if d not in found]
+    if missing:
+        async for doc in db.llm_texts.find({"_id": {"$in": missing}}, {"data": 1}):
+            text = zlib.decompress(doc["data"]).decode("utf-8")
+            _remember(doc["_id"], text)
+            found[doc["_id"]] = text
+    return found
+
+
+async def expand_texts(db, docs: List[dict], field: str) -> List[dict]:
+    """Fill `field` in place from `<field>_ref` for documents that only hold the reference."""
+    ref_field = f"{field}_ref"
+    refs = [d[ref_field] for d in docs if field not in d and ref_field in d]
+    texts = await load_texts(db, refs) if refs else {}
+    for doc in docs:
+        if field not in doc:
+            doc[field] = texts.get(doc.get(ref_field), "")
+    return docs
+
+
+async def migrate(db, batch_size: int = 500) -> dict:
+    """Move inline LLM text into llm_texts and report the space saved."""
+    report = {"documents": 0, "inline_bytes": 0, "stored_bytes": 0, "unique_texts": 0}
+    for collection_name, field in TEXT_FIELDS.items():
+        collection = db[collection_name]
+        cursor = collection.find({field: {"$exists": True}}, {"_id": 1, field: 1}).batch_size(batch_size)
+        batch = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                await _migrate_batch(db, collection, field, batch, report)
+                batch = []
+        if batch:
+            await _migrate_batch(db, collection, field, batch, report)
+    return report
+
+
+async def _migrate_batch(db, collection, field: str, batch: List[dict], report: dict):
+    texts = {}
+    updates = []
+    for doc in batch:
+        raw = (doc[field] or "").encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        texts[digest] = raw
+        report["inline_bytes"] += len(raw)
+        updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {f"{field}_ref": digest}, "$unset": {field: ""}}))
+
+    # Only texts that were not stored before add to the new footprint.
+    existing = {d["_id"] async for d in db.llm_texts.find({"_id": {"$in": list(texts)}}, {"_id": 1})}
+    new_docs = [_text_doc(d, raw) for d, raw in texts.items() if d not in existing]
+    if new_docs:
+        await db.llm_texts.bulk_write(
+            [UpdateOne({"_id": d["_id"]}, {"$setOnInsert": d}, upsert=True) for d in new_docs],
+            ordered=False
+        )
+    # References are written only after their text exists, so readers never see a dangling ref.
+    await collection.bulk_write(updates, ordered=False)
+    report["documents"] += len(batch)
+    report["unique_texts"] += len(new_docs)
+    report["stored_bytes"] += sum(d["stored_size"] for d in new_docs)
+
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    report = await migrate(client[os.environ['DB_NAME']])
+    saved = report["inline_bytes"] - report["stored_bytes"]
+    print(f"Migrated {report['documents']} documents into {report['unique_texts']} new llm_texts entries")
+    print(f"Inline text: {report['inline_bytes']} bytes, stored: {report['stored_bytes']} bytes, saved: {saved} bytes")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""Backfill ISO-string created_at/updated_at fields to native BSON dates.
+
+Runs entirely server-side with pipeline updates, so it is safe to re-run: documents
+that already hold dates no longer match the {"$type": "string"} filters. Values that
+do not parse are left untouched rather than failing the whole batch.
+"""
+import os
+import asyncio
+from pathlib import Path
+
+TIMESTAMP_FIELDS = {
+    "users": ["created_at"],
+    "assessments": ["created_at"],
+    "gap_analyses": ["created_at"],
+    "roadmaps": ["created_at"],
+    "progress": ["updated_at"],
+}
+
+
+async def backfill(db) -> dict:
+    converted = {}
+    for collection_name, fields in TIMESTAMP_FIELDS.items():
+        for field in fields:
+            result = await db[collection_name].update_many(
+                {field: {"$type": "string"}},
+                [{"$set": {field: {"$convert": {"input": f"${field}", "to": "date", "onError": f"${field}"}}}}]
+            )
+            converted[f"{collection_name}.{field}"] = result.modified_count
+
+    # Per-skill timestamps inside progress documents.
+    result = await db.progress.update_many(
+        {"skill_progress.updated_at": {"$type": "string"}},
+        [{"$set": {"skill_progress": {"$map": {
+            "input": "$skill_progress",
+            "as": "sp",
+            "in": {"$mergeObjects": ["$$sp", {"updated_at": {"$convert": {
+                "input": "$$sp.updated_at", "to": "date", "onError": "$$sp.updated_at", "onNull": None
+            }}}]}
+        }}}}]
+    )
+    converted["progress.skill_progress.updated_at"] = result.modified_count
+    return converted
+
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    converted = await backfill(client[os.environ['DB_NAME']])
+    for name, count in converted.items():
+        print(f"Converted {count} {name} values")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
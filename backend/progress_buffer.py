@@ -0,0 +1,144 @@
+"""Write-behind buffer for progress updates.
+
+Updates are kept per (user_id, career_role_id) with the last write per skill winning,
+and a background task flushes them as one bulk_write every interval. Each flushed
+update is a pipeline upsert that replaces only the buffered skills, so writes from
+other workers to other skills of the same document are preserved.
+
+Buffered state, including a batch whose write is still in flight, is visible to reads
+served by the same worker.
+"""
+import uuid
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str]
+
+
+def overall_progress(skill_progress: List[dict]) -> int:
+    return sum(sp['progress'] for sp in skill_progress) // len(skill_progress) if skill_progress else 0
+
+
+class ProgressWriteBehind:
+    def __init__(self, db, interval: float, on_flush: Optional[Callable[[str, str, List[dict]], Awaitable]] = None,
+                 resolve: Callable[[str], str] = lambda name: name):
+        self.db = db
+        self.interval = interval
+        self.on_flush = on_flush
+        self.resolve = resolve  # skill name -> canonical id, for legacy entries without skill_id
+        self.pending: Dict[Key, dict] = {}
+        # The batch being written; readers keep seeing it until the write and on_flush finish.
+        self.inflight: Dict[Key, dict] = {}
+
+    async def update(self, user_id: str, career_role_id: str, entry: dict) -> dict:
+        """Buffer one skill update and return the progress document as it will be after flushing."""
+        key = (user_id, career_role_id)
+        if key not in self.pending:
+            if key in self.inflight:
+                base = self.view(key)
+            else:
+                base = await self.db.progress.find_one({"user_id": user_id, "career_role_id": career_role_id}, {"_id": 0})
+            # Another request for the same key may have buffered while we awaited.
+            self.pending.setdefault(key, {"base": base, "skills": {}})
+        self.pending[key]["skills"][entry["skill_id"]] = entry
+        return self.view(key)
+
+    def skill_id(self, sp: dict) -> str:
+        return sp.get("skill_id") or self.resolve(sp["skill"])
+
+    def view(self, key: Key) -> dict:
+        state = self.pending[key] if key in self.pending else self.inflight[key]
+        base = state["base"] or {
+            "id": str(uuid.uuid4()),
+            "user_id": key[0],
+            "career_role_id": key[1],
+            "skill_progress": []
+        }
+        state["base"] = base
+        skills = state["skills"]
+        merged = [skills.get(self.skill_id(sp), sp) for sp in base.get("skill_progress", [])]
+        seen = {self.skill_id(sp) for sp in merged}
+        merged += [entry for skill_id, entry in skills.items() if skill_id not in seen]
+        return {
+            **base,
+            "skill_progress": merged,
+            "overall_progress": overall_progress(merged),
+            "updated_at": max(entry["updated_at"] for entry in skills.values())
+        }
+
+    def overlay(self, user_id: str, docs: List[dict]) -> List[dict]:
+        """Apply this user's buffered updates to progress documents read from Mongo."""
+        keys = [key for key in {**self.inflight, **self.pending} if key[0] == user_id]
+        if not keys:
+            return docs
+        by_role = {doc["career_role_id"]: doc for doc in docs}
+        for key in keys:
+            by_role[key[1]] = self.view(key)
+        return list(by_role.values())
+
+    def has_pending(self, user_id: str) -> bool:
+        return any(key[0] == user_id for key in [*self.pending, *self.inflight])
+
+    def _operation(self, key: Key, state: dict) -> UpdateOne:
+        entries = list(state["skills"].values())
+        skill_ids = [e["skill_id"] for e in entries]
+        skill_names = [e["skill"] for e in entries]
+        # Legacy entries spelled differently ("ReactJS" for "React") are replaced too.
+        base_progress = state["base"].get("skill_progress", []) if state["base"] else []
+        skill_names += [sp["skill"] for sp in base_progress if not sp.get("skill_id") and self.skill_id(sp) in skill_ids]
+        kept = {"$filter": {
+            "input": {"$ifNull": ["$skill_progress", []]},
+            "cond": {"$not": [{"$or": [
+                {"$in": [{"$ifNull": ["$$this.skill_id", None]}, skill_ids]},
+                {"$in": ["$$this.skill", skill_names]}
+            ]}]}
+        }}
+        return UpdateOne(
+            {"user_id": key[0], "career_role_id": key[1]},
+            [
+                {"$set": {
+                    "id": {"$ifNull": ["$id", state["base"]["id"] if state["base"] else str(uuid.uuid4())]},
+                    "skill_progress": {"$concatArrays": [kept, {"$literal": entries}]},
+                    "updated_at": max(e["updated_at"] for e in entries)
+                }},
+                {"$set": {"overall_progress": {"$ifNull": [{"$toInt": {"$floor": {"$avg": "$skill_progress.progress"}}}, 0]}}}
+            ],
+            upsert=True
+        )
+
+    async def flush(self):
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        self.inflight = pending
+        try:
+            try:
+                await self.db.progress.bulk_write([self._operation(k, s) for k, s in pending.items()], ordered=False)
+            except BaseException:
+                # Put the batch back, letting anything buffered since the swap win. This includes
+                # cancellation at shutdown, whose final flush must still see the batch.
+                for key, state in pending.items():
+                    current = self.pending.setdefault(key, {"base": state["base"], "skills": {}})
+                    current["skills"] = {**state["skills"], **current["skills"]}
+                raise
+            if self.on_flush:
+                await asyncio.gather(*[
+                    self.on_flush(user_id, career_role_id, list(state["skills"].values()))
+                    for (user_id, career_role_id), state in pending.items()
+                ])
+        finally:
+            self.inflight = {}
+
+    async def run(self):
+        """Flush forever; started as a background task by the server."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Progress write-behind flush failed")
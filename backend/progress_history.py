@@ -0,0 +1,73 @@
+"""Time-bucketed progress history.
+
+Events are appended to one document per (user, role, ISO week) holding up to
+BUCKET_CAPACITY events; a full bucket simply gets an overflow sibling for the same
+week, because the upsert filter stops matching it. A trend query over N weeks
+therefore reads about N small documents.
+"""
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+
+from pymongo import UpdateOne
+
+BUCKET_CAPACITY = 200
+DEFAULT_WINDOW = timedelta(weeks=12)
+
+
+def week_start(at: datetime) -> datetime:
+    day = at.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=day.weekday())
+
+
+def append_operation(user_id: str, career_role_id: str, entry: dict) -> UpdateOne:
+    event = {"at": entry["updated_at"], "skill": entry["skill"], "skill_id": entry["skill_id"], "progress": entry["progress"]}
+    week = week_start(entry["updated_at"])
+    return UpdateOne(
+        {"user_id": user_id, "career_role_id": career_role_id, "week": week, "count": {"$lt": BUCKET_CAPACITY}},
+        {
+            "$push": {"events": event},
+            "$inc": {"count": 1},
+            "$min": {"first_at": event["at"]},
+            "$max": {"last_at": event["at"]}
+        },
+        upsert=True
+    )
+
+
+async def record_progress(db, user_id: str, career_role_id: str, entries: List[dict]):
+    if entries:
+        await db.progress_history.bulk_write([append_operation(user_id, career_role_id, e) for e in entries], ordered=False)
+
+
+async def progress_series(db, user_id: str, career_role_id: str, since: Optional[datetime], until: Optional[datetime],
+                          points: int) -> dict:
+    """Per-skill progress series downsampled to at most `points` intervals (last value per interval)."""
+    until = until or datetime.now(timezone.utc)
+    since = since or until - DEFAULT_WINDOW
+    query = {
+        "user_id": user_id,
+        "career_role_id": career_role_id,
+        "week": {"$gte": week_start(since), "$lte": until},
+    }
+    step = (until - since) / points
+    series = {}
+    async for bucket in db.progress_history.find(query, {"_id": 0, "events": 1}):
+        for event in bucket["events"]:
+            at = event["at"] if event["at"].tzinfo else event["at"].replace(tzinfo=timezone.utc)
+            if not since <= at < until:
+                continue
+            slot = min(points - 1, int((at - since) / step))
+            skill = series.setdefault(event["skill_id"], {"skill_id": event["skill_id"], "skill": event["skill"], "slots": {}})
+            latest = skill["slots"].get(slot)
+            if latest is None or latest["at"] <= at:
+                skill["slots"][slot] = {"at": at, "progress": event["progress"]}
+
+    return {
+        "career_role_id": career_role_id,
+        "since": since,
+        "until": until,
+        "series": [
+            {"skill_id": s["skill_id"], "skill": s["skill"], "points": [s["slots"][k] for k in sorted(s["slots"])]}
+            for s in series.values()
+        ],
+    }
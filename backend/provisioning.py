@@ -0,0 +1,161 @@
+"""Bulk user provisioning from a CSV of students.
+
+Passwords are bcrypt-hashed on a thread pool (bcrypt releases the GIL, so this
+scales with cores) and accounts are inserted with unordered insert_many batches.
+The unique email index rejects duplicates, which are reported per row.
+
+Running this module lists accounts that share an email, which keep the unique index
+from being built.
+"""
+import os
+import io
+import csv
+import uuid
+import asyncio
+import logging
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+import bcrypt
+from pydantic import BaseModel, EmailStr, ValidationError
+from pymongo.errors import BulkWriteError, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+MAX_ROWS = 50_000
+INSERT_BATCH_SIZE = 1000
+DUPLICATE_KEY = 11000
+
+_hash_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('PROVISION_HASH_WORKERS', os.cpu_count() or 4)))
+
+
+class StudentRow(BaseModel):
+    name: str
+    email: EmailStr
+    password: Optional[str] = None
+
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+def parse_students(data: bytes) -> tuple:
+    """Returns (rows, errors); errors carry the 1-based CSV line number."""
+    reader = csv.DictReader(io.StringIO(data.decode("utf-8-sig")))
+    rows, errors, seen = [], [], set()
+    for line, record in enumerate(reader, start=2):
+        if len(rows) >= MAX_ROWS:
+            errors.append({"line": line, "error": f"More than {MAX_ROWS} rows"})
+            break
+        try:
+            row = StudentRow(
+                name=(record.get("name") or "").strip(),
+                email=(record.get("email") or "").strip(),
+                password=(record.get("password") or "").strip() or None
+            )
+        except ValidationError as e:
+            errors.append({"line": line, "error": e.errors()[0]["msg"]})
+            continue
+        if not row.name:
+            errors.append({"line": line, "error": "name is required"})
+        elif row.email in seen:
+            errors.append({"line": line, "email": row.email, "error": "Duplicate email in file"})
+        else:
+            seen.add(row.email)
+            rows.append(row)
+    return rows, errors
+
+
+async def duplicate_emails(db, limit: int = 20) -> List[dict]:
+    pipeline = [
+        {"$group": {"_id": "$email", "count": {"$sum": 1}, "ids": {"$push": "$id"}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit},
+    ]
+    return [{"email": d["_id"], "count": d["count"], "ids": d["ids"]}
+            async for d in db.users.aggregate(pipeline, allowDiskUse=True)]
+
+
+async def ensure_email_index(db) -> bool:
+    """Create the unique email index. Returns False, logging the offenders, if existing accounts share an email."""
+    try:
+        await db.users.create_index("email", unique=True)
+        return True
+    except OperationFailure as e:
+        if e.code != DUPLICATE_KEY:
+            raise
+    duplicates = await duplicate_emails(db)
+    logger.error("Unique email index not created; accounts share an email (run provisioning.py to list them): %s",
+                 ", ".join(f"{d['email']} x{d['count']}" for d in duplicates))
+    return False
+
+
+async def provision_users(db, rows: List[StudentRow], institution: Optional[str] = None,
+                          check_existing: bool = False) -> tuple:
+    """Create accounts; returns (created, errors). Created entries include generated passwords.
+
+    check_existing looks emails up before inserting, for when the unique email index is missing.
+    """
+    loop = asyncio.get_running_loop()
+    passwords = [row.password or secrets.token_urlsafe(12) for row in rows]
+    hashes = await asyncio.gather(*[loop.run_in_executor(_hash_pool, _hash, p) for p in passwords])
+
+    now = datetime.now(timezone.utc)
+    docs = []
+    for row, hashed in zip(rows, hashes):
+        doc = {"id": str(uuid.uuid4()), "name": row.name, "email": row.email, "password": hashed, "created_at": now}
+        if institution:
+            doc["institution"] = institution
+        docs.append(doc)
+
+    created, errors = [], []
+    for start in range(0, len(docs), INSERT_BATCH_SIZE):
+        batch = docs[start:start + INSERT_BATCH_SIZE]
+        failed = set()
+        if check_existing:
+            existing = set(await db.users.distinct("email", {"email": {"$in": [d["email"] for d in batch]}}))
+            for i, doc in enumerate(batch):
+                if doc["email"] in existing:
+                    failed.add(i)
+                    errors.append({"email": doc["email"], "error": "Email already registered"})
+        inserts = [doc for i, doc in enumerate(batch) if i not in failed]
+        try:
+            if inserts:
+                await db.users.insert_many(inserts, ordered=False)
+        except BulkWriteError as e:
+            positions = [i for i in range(len(batch)) if i not in failed]
+            for err in e.details.get("writeErrors", []):
+                failed.add(positions[err["index"]])
+                reason = "Email already registered" if err["code"] == DUPLICATE_KEY else err.get("errmsg", "Insert failed")
+                errors.append({"email": inserts[err["index"]]["email"], "error": reason})
+        for i, doc in enumerate(batch):
+            if i not in failed:
+                row = rows[start + i]
+                created.append({
+                    "id": doc["id"],
+                    "name": doc["name"],
+                    "email": doc["email"],
+                    "password": None if row.password else passwords[start + i]
+                })
+    return created, errors
+
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    duplicates = await duplicate_emails(client[os.environ['DB_NAME']], limit=1000)
+    for d in duplicates:
+        print(f"{d['email']}: {d['count']} accounts ({', '.join(d['ids'])})")
+    print(f"{len(duplicates)} emails are shared by more than one account")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
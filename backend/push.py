@@ -0,0 +1,105 @@
+"""Per-process pub/sub hub that pushes change events to connected WebSocket clients.
+
+Each connection costs one bounded asyncio.Queue and one parked coroutine, so idle
+connections are cheap. Slow consumers drop their oldest events rather than growing
+memory.
+
+With a Mongo change-stream feeder running, events come from the change stream
+instead of local publishes, so every worker sees writes made by every other worker.
+"""
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 32
+WATCHED_COLLECTIONS = {"progress": "progress.updated", "gap_analyses": "gap_analysis.created", "roadmaps": "roadmap.created"}
+
+
+class PushHub:
+    def __init__(self):
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.feeder: Optional[asyncio.Task] = None
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[user_id]
+
+    def deliver(self, user_id: str, event: dict):
+        for queue in self.subscribers.get(user_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def publish(self, user_id: str, event: dict):
+        """Publish a local write. Ignored when the change-stream feeder is the source of events."""
+        if self.feeder is None:
+            self.deliver(user_id, event)
+
+    def start_change_stream(self, db):
+        self.feeder = asyncio.create_task(self._feed(db))
+
+    async def _feed(self, db):
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": list(WATCHED_COLLECTIONS)}, "operationType": {"$in": ["insert", "update", "replace"]}}},
+            {"$project": {
+                "ns.coll": 1,
+                "fullDocument.id": 1,
+                "fullDocument.user_id": 1,
+                "fullDocument.career_role_id": 1
+            }},
+        ]
+        while True:
+            try:
+                async with db.watch(pipeline, full_document="updateLookup") as stream:
+                    async for change in stream:
+                        doc = change.get("fullDocument") or {}
+                        # Only users connected to this worker matter; skip the rest cheaply.
+                        if doc.get("user_id") in self.subscribers:
+                            self.deliver(doc["user_id"], {
+                                "type": WATCHED_COLLECTIONS[change["ns"]["coll"]],
+                                "id": doc.get("id"),
+                                "career_role_id": doc.get("career_role_id")
+                            })
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Push change stream failed; reconnecting")
+                await asyncio.sleep(1)
+
+    async def serve(self, websocket, user_id: str):
+        """Pump events to one accepted WebSocket until either side closes."""
+        queue = self.subscribe(user_id)
+
+        async def reader():
+            # Clients may send "ping"; anything else is ignored. Returns on disconnect.
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message.get("text") == "ping":
+                    await websocket.send_json({"type": "pong"})
+
+        async def writer():
+            while True:
+                await websocket.send_json(await queue.get())
+
+        tasks = [asyncio.create_task(reader()), asyncio.create_task(writer())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Collect both outcomes: a send failing on a closed socket is expected, and an
+            # unretrieved exception or unawaited cancellation would be logged per connection.
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.unsubscribe(user_id, queue)
@@ -0,0 +1,237 @@
+import time
+import math
+import json
+import logging
+import ipaddress
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """Token bucket policy for one route. scope is "user", "ip" or "global"."""
+    method: str
+    path: str
+    scope: str
+    rate: float  # tokens refilled per second
+    burst: int  # bucket capacity
+
+
+class TokenBucketStore:
+    """In-process token buckets keyed by (policy, subject). Each check is O(1)."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: Dict[Tuple, List[float]] = {}
+
+    def peek(self, key: Tuple, rate: float, burst: int) -> float:
+        """Like take, without consuming: 0 if a token is available, otherwise seconds until one is."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return 0.0
+        tokens = min(burst, bucket[0] + (time.monotonic() - bucket[1]) * rate)
+        return 0.0 if tokens >= 1 else (1 - tokens) / rate
+
+    def refund(self, key: Tuple, burst: int):
+        """Give back a token taken for a request that was rejected by another policy."""
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket[0] = min(burst, bucket[0] + 1)
+
+    def take(self, key: Tuple, rate: float, burst: int) -> float:
+        """Consume one token. Returns 0 if allowed, otherwise seconds until a token is available."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._evict(now)
+            self._buckets[key] = [burst - 1.0, now]
+            return 0.0
+
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / rate
+
+    def _evict(self, now: float):
+        # Buckets idle long enough to have refilled carry no state worth keeping;
+        # drop the oldest half so eviction cost is amortised over many inserts.
+        by_age = sorted(self._buckets.items(), key=lambda item: item[1][1])
+        for key, _ in by_age[:len(by_age) // 2]:
+            del self._buckets[key]
+
+
+class MongoWindowStore:
+    """Shared fixed-window counters in Mongo so limits hold across uvicorn workers."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._indexed = False
+
+    @staticmethod
+    def _window(rate: float, burst: int, now: float) -> Tuple[float, float]:
+        # A window long enough to refill the whole bucket allows `burst` requests.
+        window = max(1.0, burst / rate)
+        return math.floor(now / window) * window, window
+
+    async def take(self, key: Tuple, rate: float, burst: int) -> float:
+        if not self._indexed:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+
+        now = time.time()
+        window_start, window = self._window(rate, burst, now)
+        doc = await self.collection.find_one_and_update(
+            {"_id": f"{'|'.join(map(str, key))}|{int(window_start)}"},
+            {
+                "$inc": {"count": 1},
+                "$setOnInsert": {"expires_at": datetime.fromtimestamp(window_start + window, timezone.utc) + timedelta(seconds=60)}
+            },
+            upsert=True,
+            return_document=True
+        )
+        if doc["count"] <= burst:
+            return 0.0
+        return window_start + window - now
+
+    async def refund(self, key: Tuple, rate: float, burst: int):
+        window_start, _ = self._window(rate, burst, time.time())
+        await self.collection.update_one(
+            {"_id": f"{'|'.join(map(str, key))}|{int(window_start)}", "count": {"$gt": 0}},
+            {"$inc": {"count": -1}}
+        )
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying RateLimitPolicy rules before the request reaches FastAPI."""
+
+    def __init__(self, app, policies: List[RateLimitPolicy], user_key: Callable[[Optional[str]], Optional[str]],
+                 shared_store: Optional[MongoWindowStore] = None, trusted_proxies: Iterable[str] = (),
+                 exempt: Optional[Callable[[dict], Awaitable[bool]]] = None):
+        self.app = app
+        self.user_key = user_key
+        # Requests for which exempt(scope) is true skip every bucket, e.g. idempotent retries.
+        self.exempt = exempt
+        # Peers whose X-Forwarded-For is believed, as addresses or CIDR networks.
+        self.trusted_proxies = [ipaddress.ip_network(p.strip(), strict=False) for p in trusted_proxies if p.strip()]
+        self.local = TokenBucketStore()
+        self.shared = shared_store
+        self.policies: Dict[Tuple[str, str], List[RateLimitPolicy]] = {}
+        for policy in policies:
+            self.policies.setdefault((policy.method, policy.path), []).append(policy)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        policies = self.policies.get((scope["method"], scope["path"]))
+        if not policies:
+            return await self.app(scope, receive, send)
+
+        if self.exempt is not None and await self.is_exempt(scope):
+            return await self.app(scope, receive, send)
+        retry_after = await self.check(scope, policies)
+        if retry_after > 0:
+            return await self.reject(send, retry_after)
+        return await self.app(scope, receive, send)
+
+    async def is_exempt(self, scope) -> bool:
+        try:
+            return await self.exempt(scope)
+        except Exception:
+            logger.exception("Rate limit exemption check failed")
+            return False
+
+    def applicable(self, scope, policies: List[RateLimitPolicy]) -> List[Tuple[RateLimitPolicy, Tuple]]:
+        """(policy, bucket key) pairs for this request, per-subject policies before global ones."""
+        keyed = [(policy, self.subject(scope, policy.scope)) for policy in policies]
+        # Requests without a valid user are rejected by the route anyway. Letting them spend the
+        # global bucket of a user-limited route would let anonymous clients starve every user.
+        if any(policy.scope == "user" and subject is None for policy, subject in keyed):
+            keyed = [(policy, subject) for policy, subject in keyed if policy.scope != "global"]
+        keyed.sort(key=lambda item: item[0].scope == "global")
+        return [(policy, (policy.method, policy.path, policy.scope, subject))
+                for policy, subject in keyed if subject is not None]
+
+    async def check(self, scope, policies: List[RateLimitPolicy]) -> float:
+        """Spend one token from every applicable bucket, or none at all if any of them rejects."""
+        keyed = self.applicable(scope, policies)
+        # Local buckets: check all, then take all, with no await in between.
+        retry_after = max([self.local.peek(key, p.rate, p.burst) for p, key in keyed], default=0.0)
+        if retry_after > 0:
+            return retry_after
+        for policy, key in keyed:
+            self.local.take(key, policy.rate, policy.burst)
+        if self.shared is None:
+            return 0.0
+
+        taken = []
+        try:
+            for policy, key in keyed:
+                retry_after = await self.shared.take(key, policy.rate, policy.burst)
+                if retry_after > 0:
+                    break
+                taken.append((policy, key))
+        except Exception:
+            # The shared backend is best effort; local limits still apply.
+            logger.exception("Shared rate limit backend unavailable")
+            return 0.0
+        if retry_after > 0:
+            for policy, key in keyed:
+                self.local.refund(key, policy.burst)
+            for policy, key in taken:
+                try:
+                    await self.shared.refund(key, policy.rate, policy.burst)
+                except Exception:
+                    logger.exception("Shared rate limit backend unavailable")
+        return retry_after
+
+    def subject(self, scope, kind: str) -> Optional[str]:
+        if kind == "global":
+            return "*"
+        if kind == "ip":
+            return self.client_ip(scope)
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                return self.user_key(value.decode("latin-1"))
+        return None
+
+    def is_trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def client_ip(self, scope) -> str:
+        """The peer address, or the nearest untrusted X-Forwarded-For hop when the peer is a trusted proxy."""
+        peer = scope["client"][0] if scope.get("client") else "unknown"
+        if not self.is_trusted(peer):
+            return peer
+        hops = []
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                hops += [hop.strip() for hop in value.decode("latin-1").split(",") if hop.strip()]
+        # Walk right to left: every hop after the first untrusted one was appended by our own proxies.
+        for hop in reversed(hops):
+            if not self.is_trusted(hop):
+                return hop
+        return hops[0] if hops else peer
+
+    async def reject(self, send, retry_after: float):
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
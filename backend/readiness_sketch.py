@@ -0,0 +1,143 @@
+"""Per-role readiness distributions for percentile ranks.
+
+readiness_score is bounded to [0, 100] and rounded to one decimal, so a fixed
+1001-bin histogram is an exact quantile sketch: constant memory per role, merged
+across workers by adding counts, and a rank costs one pass over the bins.
+
+Each worker keeps the merged view it last loaded plus its own unflushed additions.
+Flushing $inc's the additions into readiness_sketches, which is how sketches from
+different workers merge.
+"""
+import os
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+from pymongo import ReplaceOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+BINS = 1001  # 0.0 .. 100.0 in steps of 0.1
+
+
+def score_bin(score: float) -> int:
+    return min(BINS - 1, max(0, int(round(score * 10))))
+
+
+class ReadinessHistogram:
+    def __init__(self):
+        self.counts = [0] * BINS
+        self.total = 0
+
+    def add(self, score: float, count: int = 1):
+        self.counts[score_bin(score)] += count
+        self.total += count
+
+    def merge(self, other: "ReadinessHistogram"):
+        for i, count in enumerate(other.counts):
+            if count:
+                self.counts[i] += count
+        self.total += other.total
+
+
+class ReadinessSketches:
+    def __init__(self):
+        self.merged: Dict[str, ReadinessHistogram] = {}
+        self.pending: Dict[str, ReadinessHistogram] = {}
+
+    def add(self, role_id: str, score: float):
+        self.pending.setdefault(role_id, ReadinessHistogram()).add(score)
+
+    def percentile_rank(self, role_id: str, score: float) -> Optional[float]:
+        """Share of the role's scores below `score`, counting ties as half, in percent."""
+        b = score_bin(score)
+        below = equal = total = 0
+        for source in (self.merged, self.pending):
+            hist = source.get(role_id)
+            if hist:
+                below += sum(hist.counts[:b])
+                equal += hist.counts[b]
+                total += hist.total
+        if not total:
+            return None
+        return round((below + equal / 2) / total * 100, 1)
+
+    async def flush(self, db):
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        ops = [
+            UpdateOne({"_id": role_id}, {"$inc": {f"bins.{i}": c for i, c in enumerate(hist.counts) if c}}, upsert=True)
+            for role_id, hist in pending.items()
+        ]
+        try:
+            await db.readiness_sketches.bulk_write(ops, ordered=False)
+        except BaseException:
+            # Also on cancellation, so the final flush at shutdown still sees these counts.
+            for role_id, hist in pending.items():
+                self.pending.setdefault(role_id, ReadinessHistogram()).merge(hist)
+            raise
+        # Keep our own additions visible until the next refresh reloads them.
+        for role_id, hist in pending.items():
+            self.merged.setdefault(role_id, ReadinessHistogram()).merge(hist)
+
+    async def refresh(self, db):
+        merged = {}
+        async for doc in db.readiness_sketches.find({}):
+            hist = ReadinessHistogram()
+            for i, count in doc.get("bins", {}).items():
+                hist.counts[int(i)] = count
+                hist.total += count
+            merged[doc["_id"]] = hist
+        self.merged = merged
+
+    async def run(self, db, interval: float):
+        """Flush and reload forever; started as a background task by the server."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush(db)
+                await self.refresh(db)
+            except Exception:
+                logger.exception("Readiness sketch sync failed")
+
+
+async def rebuild(db) -> int:
+    """Recompute readiness_sketches from gap_analyses."""
+    pipeline = [
+        {"$match": {"readiness_score": {"$type": "number"}}},
+        {"$group": {
+            "_id": {"role": "$career_role_id", "bin": {"$toInt": {"$round": [{"$multiply": ["$readiness_score", 10]}, 0]}}},
+            "count": {"$sum": 1}
+        }},
+    ]
+    sketches: Dict[str, dict] = {}
+    async for row in db.gap_analyses.aggregate(pipeline, allowDiskUse=True):
+        bins = sketches.setdefault(row["_id"]["role"], {})
+        b = str(min(BINS - 1, max(0, row["_id"]["bin"])))
+        bins[b] = bins.get(b, 0) + row["count"]
+    # Replace each role's document in place rather than emptying the collection, so
+    # workers flushing meanwhile never $inc into a missing document that is then lost.
+    if sketches:
+        await db.readiness_sketches.bulk_write(
+            [ReplaceOne({"_id": role}, {"bins": bins}, upsert=True) for role, bins in sketches.items()],
+            ordered=False
+        )
+    await db.readiness_sketches.delete_many({"_id": {"$nin": list(sketches)}})
+    return len(sketches)
+
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    n_roles = await rebuild(client[os.environ['DB_NAME']])
+    print(f"Rebuilt readiness sketches for {n_roles} roles")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
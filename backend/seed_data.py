@@ -1,14 +1,22 @@
 import asyncio
+import argparse
+import random
+import time
+import uuid
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+from datetime import datetime, timezone, timedelta
+import bcrypt
+from llm_texts import store_texts, text_hash
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
 async def seed_career_roles():
@@ -215,7 +223,263 @@ async def seed_learning_resources():
     await db.resources.insert_many(resources)
     print(f"Seeded {len(resources)} learning resources")
 
+# Synthetic dataset generation
+#
+# Every document is derived from (seed, collection, index) only, so any batch can be
+# generated independently and in parallel, and re-running with the same seed upserts
+# the exact same documents instead of duplicating them.
+
+SYNTHETIC_CATEGORIES = ["Frontend", "Backend", "Database", "DevOps", "AI/ML", "Design", "Security", "Tools"]
+SYNTHETIC_LEVELS = ["Beginner", "Intermediate", "Advanced"]
+SYNTHETIC_RESOURCE_TYPES = ["Video", "Article", "Course", "Tutorial"]
+SYNTHETIC_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+SYNTHETIC_PASSWORD = "synthetic-password"
+
+def synthetic_id(seed: int, kind: str, index) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, f"skillgap:{seed}:{kind}:{index}"))
+
+def synthetic_rng(seed: int, kind: str, index) -> random.Random:
+    return random.Random(f"{seed}:{kind}:{index}")
+
+def synthetic_timestamp(rng: random.Random, start: datetime, days: int = 365) -> datetime:
+    return start + timedelta(seconds=rng.randrange(days * 86400))
+
+def synthetic_insights(role: dict) -> str:
+    return f"Synthetic insights for {role['title']}."
+
+def synthetic_recommendations(role: dict) -> str:
+    return f"Synthetic recommendations for {role['title']}."
+
+def required_level(level: str) -> int:
+    return 3 if level == 'Beginner' else 4 if level == 'Intermediate' else 5
+
+def build_synthetic_roles(seed: int, n_roles: int, skills_per_role: int, skill_pool: int) -> list:
+    roles = []
+    for i in range(n_roles):
+        rng = synthetic_rng(seed, "role", i)
+        skill_ids = rng.sample(range(skill_pool), min(skills_per_role, skill_pool))
+        roles.append({
+            "id": synthetic_id(seed, "role", i),
+            "title": f"Synthetic Role {i}",
+            "description": f"Generated career role {i} for load testing.",
+            "required_skills": [
+                {
+                    "name": f"Skill {k}",
+                    "category": SYNTHETIC_CATEGORIES[k % len(SYNTHETIC_CATEGORIES)],
+                    "level": rng.choices(SYNTHETIC_LEVELS, weights=[3, 5, 2])[0]
+                }
+                for k in skill_ids
+            ],
+            "average_salary": f"${rng.randrange(50, 100)},000 - ${rng.randrange(100, 180)},000",
+            "growth_rate": f"{rng.randrange(5, 40)}%"
+        })
+    return roles
+
+def build_synthetic_resource(seed: int, index: int, skill_pool: int) -> dict:
+    rng = synthetic_rng(seed, "resource", index)
+    return {
+        "id": synthetic_id(seed, "resource", index),
+        "title": f"Synthetic Resource {index}",
+        "description": f"Generated learning resource {index}.",
+        "url": f"https://example.com/resources/{index}",
+        "type": rng.choice(SYNTHETIC_RESOURCE_TYPES),
+        "difficulty": rng.choices(SYNTHETIC_LEVELS, weights=[5, 3, 2])[0],
+        "skills": [f"Skill {k}" for k in rng.sample(range(skill_pool), rng.randint(1, 3))],
+        "duration": f"{rng.randint(1, 60)} hours"
+    }
+
+def build_synthetic_user(seed: int, index: int, roles: list, password_hash: str) -> dict:
+    """Build one user with their assessment, gap analysis, roadmap and progress history"""
+    rng = synthetic_rng(seed, "user", index)
+    user_id = synthetic_id(seed, "user", index)
+    joined = synthetic_timestamp(rng, SYNTHETIC_EPOCH)
+    docs = {"users": [{
+        "id": user_id,
+        "name": f"Synthetic User {index}",
+        # Emails are unique across the whole users collection, so they carry the seed like the ids do.
+        "email": f"user{index}.seed{seed}@synthetic.example.com",
+        "password": password_hash,
+        "created_at": joined
+    }], "assessments": [], "gap_analyses": [], "roadmaps": [], "progress": []}
+
+    # Most users target one role; a long tail explores several. Role popularity is
+    # Zipf-like so a handful of roles dominate, as in production.
+    n_targets = min(len(roles), 1 + int(rng.expovariate(1.5)))
+    role_weights = [1 / (r + 1) for r in range(len(roles))]
+    targets = {id(r): r for r in rng.choices(roles, weights=role_weights, k=n_targets)}.values()
+
+    for t, role in enumerate(targets):
+        # Learner ability is per user; each re-assessment drifts upward.
+        ability = rng.betavariate(2, 3) * 5
+        n_assessments = 1 + min(int(rng.expovariate(0.8)), 9)
+        when = joined
+        levels = {}
+        for a in range(n_assessments):
+            when = when + timedelta(days=rng.randint(1, 45))
+            tag = f"{index}:{t}:{a}"
+            levels = {
+                s["name"]: max(1, min(5, round(rng.gauss(ability + a * 0.3, 1))))
+                for s in role["required_skills"] if rng.random() < 0.9
+            }
+            assessment_id = synthetic_id(seed, "assessment", tag)
+            docs["assessments"].append({
+                "id": assessment_id,
+                "user_id": user_id,
+                "career_role_id": role["id"],
+                "skills": [{"skill_name": k, "current_level": v} for k, v in levels.items()],
+                "created_at": when
+            })
+
+            if rng.random() > 0.7:
+                continue
+            skill_gaps = []
+            readiness_sum = 0
+            for req_skill in role["required_skills"]:
+                current = levels.get(req_skill["name"], 0)
+                required = required_level(req_skill["level"])
+                gap = max(0, required - current)
+                readiness_sum += min(current / required * 100, 100)
+                if gap > 0:
+                    skill_gaps.append({
+                        "skill": req_skill["name"],
+                        "category": req_skill["category"],
+                        "current_level": current,
+                        "required_level": required,
+                        "gap": gap,
+                        "priority": "High" if gap >= 3 else "Medium" if gap >= 2 else "Low"
+                    })
+            analysis_id = synthetic_id(seed, "analysis", tag)
+            docs["gap_analyses"].append({
+                "id": analysis_id,
+                "user_id": user_id,
+                "career_role_id": role["id"],
+                "skill_gaps": skill_gaps,
+                "readiness_score": round(readiness_sum / len(role["required_skills"]), 1),
+                "ai_insights_ref": text_hash(synthetic_insights(role)),
+                "created_at": when
+            })
+
+            if rng.random() > 0.5:
+                continue
+            total_weeks = sum(g["gap"] * 2 for g in skill_gaps)
+            docs["roadmaps"].append({
+                "id": synthetic_id(seed, "roadmap", tag),
+                "user_id": user_id,
+                "career_role_id": role["id"],
+                "roadmap_items": [{
+                    "skill": g["skill"],
+                    "priority": g["priority"],
+                    "estimated_time": f"{g['gap'] * 2} weeks",
+                    "resources": [],
+                    "milestones": [f"Achieve intermediate proficiency in {g['skill']}"]
+                } for g in skill_gaps],
+                "total_duration": f"{total_weeks} weeks (~{total_weeks//4} months)",
+                "ai_recommendations_ref": text_hash(synthetic_recommendations(role)),
+                "created_at": when
+            })
+
+        if levels and rng.random() < 0.6:
+            skill_progress = [{
+                "skill": name,
+                "progress": min(100, int(rng.betavariate(2, 2) * 100)),
+                "notes": "",
+                "updated_at": when
+            } for name in levels]
+            docs["progress"].append({
+                "id": synthetic_id(seed, "progress", f"{index}:{t}"),
+                "user_id": user_id,
+                "career_role_id": role["id"],
+                "skill_progress": skill_progress,
+                "overall_progress": sum(sp["progress"] for sp in skill_progress) // len(skill_progress),
+                "updated_at": when
+            })
+    return docs
+
+async def bulk_upsert(collection, docs: list):
+    if not docs:
+        return
+    await collection.bulk_write(
+        [UpdateOne({"id": d["id"]}, {"$set": d}, upsert=True) for d in docs],
+        ordered=False
+    )
+
+async def seed_synthetic(args):
+    """Generate a deterministic synthetic dataset at the requested scale"""
+    started = time.monotonic()
+    # Upserts match on "id"; without an index every one of them is a collection scan.
+    for name in ["career_roles", "resources", "users", "assessments", "gap_analyses", "roadmaps", "progress"]:
+        await db[name].create_index("id", unique=True)
+
+    roles = build_synthetic_roles(args.seed, args.roles, args.skills_per_role, args.skill_pool)
+    await bulk_upsert(db.career_roles, roles)
+    print(f"Upserted {len(roles)} synthetic career roles")
+    # Analyses and roadmaps reference these by hash, as the API writes them.
+    texts = await store_texts(db, [f(role) for role in roles for f in (synthetic_insights, synthetic_recommendations)])
+    print(f"Stored {len(texts)} synthetic LLM texts")
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    written = {"resources": 0}
+
+    async def write_batch(collection_name: str, docs: list):
+        async with semaphore:
+            await bulk_upsert(db[collection_name], docs)
+            written[collection_name] = written.get(collection_name, 0) + len(docs)
+
+    await asyncio.gather(*[
+        write_batch("resources", [build_synthetic_resource(args.seed, i, args.skill_pool)
+                                  for i in range(start, min(start + args.batch_size, args.resources))])
+        for start in range(0, args.resources, args.batch_size)
+    ])
+    print(f"Upserted {written['resources']} synthetic learning resources")
+
+    # One bcrypt hash shared by every synthetic user: hashing millions of passwords
+    # would dominate the run time and the value is identical anyway.
+    password_hash = bcrypt.hashpw(SYNTHETIC_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+    pending = set()
+    for start in range(0, args.users, args.batch_size):
+        batch = {"users": [], "assessments": [], "gap_analyses": [], "roadmaps": [], "progress": []}
+        for i in range(start, min(start + args.batch_size, args.users)):
+            for name, docs in build_synthetic_user(args.seed, i, roles, password_hash).items():
+                batch[name].extend(docs)
+        for name, docs in batch.items():
+            pending.add(asyncio.ensure_future(write_batch(name, docs)))
+        # Bound the number of generated-but-unwritten batches so memory stays flat.
+        if len(pending) >= args.concurrency * 5:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+    if pending:
+        await asyncio.gather(*pending)
+
+    total = sum(written.values()) + len(roles)
+    elapsed = time.monotonic() - started
+    for name in ["users", "assessments", "gap_analyses", "roadmaps", "progress"]:
+        print(f"Upserted {written.get(name, 0)} synthetic {name}")
+    print(f"Wrote {total} documents in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} docs/s)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Seed the Skill Gap AI database")
+    parser.add_argument("--synthetic", action="store_true", help="generate a synthetic dataset instead of the sample data")
+    parser.add_argument("--seed", type=int, default=42, help="random seed; the same seed always produces the same documents")
+    parser.add_argument("--roles", type=int, default=50)
+    parser.add_argument("--skills-per-role", type=int, default=8)
+    parser.add_argument("--skill-pool", type=int, default=300, help="number of distinct skill names shared across roles")
+    parser.add_argument("--resources", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="resources or users generated per batch; a user batch is written as one bulk write per "
+                             "collection, so history collections get several documents per user")
+    parser.add_argument("--concurrency", type=int, default=8, help="bulk writes in flight at once")
+    return parser.parse_args()
+
 async def main():
+    args = parse_args()
+    if args.synthetic:
+        print("Starting synthetic dataset generation...")
+        await seed_synthetic(args)
+        client.close()
+        return
     print("Starting database seeding...")
     await seed_career_roles()
     await seed_learning_resources()
@@ -1,25 +1,44 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, Response, UploadFile, File, WebSocket, WebSocketDisconnect, Header
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
 import os
+import json
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
+from email.utils import format_datetime, parsedate_to_datetime
 import jwt
 import bcrypt
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from rate_limit import RateLimitMiddleware, RateLimitPolicy, MongoWindowStore
+from catalog_snapshot import CatalogSnapshot, publish as publish_catalog_snapshot
+from compression import CompressionMiddleware
+from llm_texts import store_text, load_texts, expand_texts
+from analytics import record_gap_analysis, role_gap_summary
+from readiness_sketch import ReadinessSketches
+from export import EXPORT_FIELDS, EXPORT_FORMATS, EXPORT_TIME_FIELDS, stream_export, stream_export_for_users
+from skill_taxonomy import BUILTIN_TAXONOMY, SkillTaxonomy, load_taxonomy
+from tracing import TracingMiddleware, SamplingProfiler, span
+from progress_buffer import ProgressWriteBehind
+from provisioning import ensure_email_index, parse_students, provision_users
+from push import PushHub
+from progress_history import record_progress, progress_series
+from idempotency import key_exists, run_idempotent
+from llm_router import LlmRouter, usage_report
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
 # JWT Configuration
@@ -30,6 +49,31 @@ JWT_EXPIRATION_HOURS = 720
 # Security
 security = HTTPBearer()
 
+# Rate Limiting (rate is tokens per second, burst is bucket capacity)
+RATE_LIMIT_POLICIES = [
+    RateLimitPolicy("POST", "/api/auth/login", scope="ip", rate=10 / 60, burst=10),
+    RateLimitPolicy("POST", "/api/auth/register", scope="ip", rate=5 / 60, burst=5),
+    RateLimitPolicy("POST", "/api/analysis/gap", scope="user", rate=5 / 60, burst=5),
+    RateLimitPolicy("POST", "/api/analysis/gap", scope="global", rate=20, burst=50),
+    RateLimitPolicy("POST", "/api/roadmap/generate", scope="user", rate=5 / 60, burst=5),
+    RateLimitPolicy("POST", "/api/roadmap/generate", scope="global", rate=20, burst=50),
+]
+RATE_LIMIT_SHARED = os.environ.get('RATE_LIMIT_BACKEND', '') == 'mongo'
+# Behind an ingress every request comes from the proxy, so per-IP limits must read
+# X-Forwarded-For from it. Comma-separated addresses or CIDR ranges, e.g. "10.0.0.0/8".
+RATE_LIMIT_TRUSTED_PROXIES = os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', '').split(',')
+
+# Readiness percentiles (per-role sketches synced with other workers every few seconds)
+readiness_sketches = ReadinessSketches()
+READINESS_SKETCH_SYNC_SECONDS = float(os.environ.get('READINESS_SKETCH_SYNC_SECONDS', '10'))
+
+# Skill taxonomy (built-in entries until the full taxonomy is loaded at startup)
+skill_taxonomy = SkillTaxonomy(BUILTIN_TAXONOMY)
+
+# Catalog snapshot shared read-only by all workers (disabled unless CATALOG_SNAPSHOT is set)
+CATALOG_SNAPSHOT_PATH = os.environ.get('CATALOG_SNAPSHOT')
+catalog = CatalogSnapshot(Path(CATALOG_SNAPSHOT_PATH)) if CATALOG_SNAPSHOT_PATH else None
+
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
@@ -54,10 +98,22 @@ class TokenResponse(BaseModel):
     token: str
     user: User
 
+class ProvisionedUser(BaseModel):
+    id: str
+    name: str
+    email: EmailStr
+    password: Optional[str] = None  # only for generated passwords (invite mode)
+    token: Optional[str] = None  # only in token mode
+
+class ProvisionResponse(BaseModel):
+    created: List[ProvisionedUser]
+    errors: List[dict]
+
 class Skill(BaseModel):
     name: str
     category: str
     level: str = "Beginner"  # Beginner, Intermediate, Advanced
+    skill_id: Optional[str] = None
 
 class CareerRole(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -71,6 +127,7 @@ class CareerRole(BaseModel):
 class SkillAssessment(BaseModel):
     skill_name: str
     current_level: int  # 1-5
+    skill_id: Optional[str] = None
 
 class SkillAssessmentCreate(BaseModel):
     career_role_id: str
@@ -91,7 +148,9 @@ class GapAnalysis(BaseModel):
     career_role_id: str
     skill_gaps: List[dict]
     readiness_score: float
+    readiness_percentile: Optional[float] = None
     ai_insights: str
+    ai_insights_ref: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class LearningResource(BaseModel):
@@ -103,6 +162,7 @@ class LearningResource(BaseModel):
     type: str  # Video, Article, Course, Tutorial
     difficulty: str  # Beginner, Intermediate, Advanced
     skills: List[str]
+    skill_ids: List[str] = []
     duration: str
 
 class RoadmapItem(BaseModel):
@@ -120,6 +180,7 @@ class LearningRoadmap(BaseModel):
     roadmap_items: List[RoadmapItem]
     total_duration: str
     ai_recommendations: str
+    ai_recommendations_ref: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class ProgressUpdate(BaseModel):
@@ -138,10 +199,12 @@ class Progress(BaseModel):
 
 # Auth Helpers
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    with span("bcrypt.hash"):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    with span("bcrypt.verify"):
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
 def create_token(user_id: str) -> str:
     expiration = datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
@@ -161,22 +224,56 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     token = credentials.credentials
     return decode_token(token)
 
+async def get_admin_user(user_id: str = Depends(get_current_user)) -> str:
+    user_doc = await db.users.find_one({"id": user_id}, {"_id": 0, "is_admin": 1})
+    if not user_doc or not user_doc.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user_id
+
+def rate_limit_user_key(authorization: Optional[str]) -> Optional[str]:
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    try:
+        return decode_token(authorization[7:])
+    except HTTPException:
+        return None
+
+def serialize_response(model_cls, value) -> Response:
+    """Validate and serialize inside a span, so traces include the cost FastAPI would pay after the handler returns."""
+    with span("pydantic.response"):
+        model = value if isinstance(value, model_cls) else model_cls.model_validate(value)
+        return Response(content=model.model_dump_json(), media_type="application/json")
+
+# Cleared at startup if existing duplicate emails keep the unique index from being built.
+email_index_ready = True
+
+async def rate_limit_exempt(scope) -> bool:
+    """Retries of an Idempotency-Key already on record are replayed, not re-run, so they cost no tokens."""
+    headers = dict(scope["headers"])
+    key = headers.get(b"idempotency-key")
+    user_id = rate_limit_user_key(headers.get(b"authorization", b"").decode("latin-1"))
+    if not key or not user_id:
+        return False
+    return await key_exists(db, user_id, scope["path"].removeprefix("/api/"), key.decode("latin-1"))
+
 # Auth Endpoints
 @api_router.post("/auth/register", response_model=TokenResponse)
 async def register(user_data: UserRegister):
-    existing = await db.users.find_one({"email": user_data.email}, {"_id": 0})
-    if existing:
+    if not email_index_ready and await db.users.find_one({"email": user_data.email}, {"_id": 1}):
         raise HTTPException(status_code=400, detail="Email already registered")
-    
     user_dict = {
         "id": str(uuid.uuid4()),
         "name": user_data.name,
         "email": user_data.email,
         "password": hash_password(user_data.password),
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
     
-    await db.users.insert_one(user_dict)
+    # The unique email index makes this a single round trip that is safe under concurrent sign-ups.
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
     user = User(id=user_dict["id"], name=user_dict["name"], email=user_dict["email"])
     token = create_token(user_dict["id"])
     
@@ -184,14 +281,15 @@ async def register(user_data: UserRegister):
 
 @api_router.post("/auth/login", response_model=TokenResponse)
 async def login(credentials: UserLogin):
-    user_doc = await db.users.find_one({"email": credentials.email}, {"_id": 0})
+    with span("mongo.users.find_one"):
+        user_doc = await db.users.find_one({"email": credentials.email}, {"_id": 0})
     if not user_doc or not verify_password(credentials.password, user_doc["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    user = User(id=user_doc["id"], name=user_doc["name"], email=user_doc["email"])
-    token = create_token(user_doc["id"])
-    
-    return TokenResponse(token=token, user=user)
+    with span("jwt.encode"):
+        token = create_token(user_doc["id"])
+    user = {"id": user_doc["id"], "name": user_doc["name"], "email": user_doc["email"]}
+    return serialize_response(TokenResponse, {"token": token, "user": user})
 
 @api_router.get("/auth/me", response_model=User)
 async def get_me(user_id: str = Depends(get_current_user)):
@@ -200,14 +298,101 @@ async def get_me(user_id: str = Depends(get_current_user)):
         raise HTTPException(status_code=404, detail="User not found")
     return User(**user_doc)
 
+# Conditional GET Helpers
+#
+# Every write to a user's history bumps a per-user, per-collection version in
+# user_versions. Polls compare it with If-None-Match / If-Modified-Since and answer
+# 304 without reading the history documents at all.
+async def bump_version(user_id: str, resource: str):
+    await db.user_versions.update_one(
+        {"user_id": user_id},
+        {"$inc": {f"{resource}.version": 1}, "$set": {f"{resource}.modified_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+async def history_validators(request: Request, response: Response, user_id: str, resource: str) -> bool:
+    """Set ETag/Last-Modified on the response and return True if the client copy is current."""
+    doc = await db.user_versions.find_one({"user_id": user_id}, {"_id": 0, resource: 1}) or {}
+    state = doc.get(resource, {})
+    etag = f'W/"{resource}-{state.get("version", 0)}"'
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    modified_at = state.get("modified_at")
+    if modified_at:
+        modified_at = modified_at.replace(tzinfo=timezone.utc, microsecond=0)
+        response.headers["Last-Modified"] = format_datetime(modified_at, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified_at:
+        try:
+            return modified_at <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def not_modified(response: Response) -> Response:
+    return Response(status_code=304, headers=dict(response.headers))
+
+# History Query Helpers
+def history_query(user_id: str, field: str, since: Optional[datetime], until: Optional[datetime]) -> dict:
+    """Filter for a user's history within [since, until), served by the (user_id, field) index."""
+    query = {"user_id": user_id}
+    window = {}
+    if since:
+        window["$gte"] = since if since.tzinfo else since.replace(tzinfo=timezone.utc)
+    if until:
+        window["$lt"] = until if until.tzinfo else until.replace(tzinfo=timezone.utc)
+    if window:
+        query[field] = window
+    return query
+
+# Progress write-behind buffer (disabled unless PROGRESS_WRITE_BEHIND_MS is set)
+PROGRESS_WRITE_BEHIND_MS = os.environ.get('PROGRESS_WRITE_BEHIND_MS')
+async def progress_flushed(user_id: str, career_role_id: str, entries: List[dict]):
+    await bump_version(user_id, "progress")
+    await record_progress(db, user_id, career_role_id, entries)
+
+progress_buffer = ProgressWriteBehind(
+    db, int(PROGRESS_WRITE_BEHIND_MS) / 1000, on_flush=progress_flushed,
+    resolve=lambda name: skill_taxonomy.resolve(name)
+) if PROGRESS_WRITE_BEHIND_MS else None
+
+# Push notifications (PUSH_CHANGE_STREAM=1 feeds them from a Mongo change stream across workers)
+push_hub = PushHub()
+PUSH_CHANGE_STREAM = os.environ.get('PUSH_CHANGE_STREAM', '') == '1'
+PUSH_AUTH_TIMEOUT_SECONDS = 10
+
+def notify(user_id: str, event_type: str, doc: dict):
+    push_hub.publish(user_id, {"type": event_type, "id": doc.get("id"), "career_role_id": doc.get("career_role_id")})
+
+# LLM routing and usage accounting
+llm_router = LlmRouter()
+
+# Catalog Helpers
+async def find_role(role_id: str) -> Optional[dict]:
+    if catalog:
+        role = catalog.get_json("roles", role_id)
+        if role is not None:
+            return role
+    return await db.career_roles.find_one({"id": role_id}, {"_id": 0})
+
 # Career Roles Endpoints
 @api_router.get("/roles", response_model=List[CareerRole])
 async def get_roles():
+    raw = catalog.get("roles_list", "") if catalog else None
+    if raw is not None:
+        return Response(content=raw, media_type="application/json")
     roles = await db.career_roles.find({}, {"_id": 0}).to_list(100)
     return roles
 
 @api_router.get("/roles/{role_id}", response_model=CareerRole)
 async def get_role(role_id: str):
+    raw = catalog.get("roles", role_id) if catalog else None
+    if raw is not None:
+        return Response(content=raw, media_type="application/json")
     role = await db.career_roles.find_one({"id": role_id}, {"_id": 0})
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
@@ -220,64 +405,56 @@ async def create_assessment(assessment: SkillAssessmentCreate, user_id: str = De
         "id": str(uuid.uuid4()),
         "user_id": user_id,
         "career_role_id": assessment.career_role_id,
-        "skills": [s.model_dump() for s in assessment.skills],
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "skills": [{**s.model_dump(), "skill_id": skill_taxonomy.resolve(s.skill_name)} for s in assessment.skills],
+        "created_at": datetime.now(timezone.utc)
     }
     
     await db.assessments.insert_one(assessment_dict)
+    await bump_version(user_id, "assessments")
     return SkillAssessmentResponse(**assessment_dict)
 
 @api_router.get("/assessments", response_model=List[SkillAssessmentResponse])
-async def get_assessments(user_id: str = Depends(get_current_user)):
-    assessments = await db.assessments.find({"user_id": user_id}, {"_id": 0}).to_list(100)
+async def get_assessments(request: Request, response: Response, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                          user_id: str = Depends(get_current_user)):
+    if await history_validators(request, response, user_id, "assessments"):
+        return not_modified(response)
+    query = history_query(user_id, "created_at", since, until)
+    assessments = await db.assessments.find(query, {"_id": 0}).sort("created_at", 1).to_list(100)
     return assessments
 
 # Gap Analysis Endpoint (AI-Powered)
 @api_router.post("/analysis/gap", response_model=GapAnalysis)
-async def analyze_gap(assessment_id: str, user_id: str = Depends(get_current_user)):
-    assessment = await db.assessments.find_one({"id": assessment_id, "user_id": user_id}, {"_id": 0})
+async def analyze_gap(assessment_id: str, idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+                      user_id: str = Depends(get_current_user)):
+    if idempotency_key is None:
+        analysis = await create_gap_analysis(assessment_id, user_id)
+    else:
+        analysis = await run_idempotent(db, user_id, "analysis/gap", idempotency_key, {"assessment_id": assessment_id},
+                                        lambda: create_gap_analysis(assessment_id, user_id))
+    return serialize_response(GapAnalysis, analysis)
+
+async def create_gap_analysis(assessment_id: str, user_id: str) -> GapAnalysis:
+    with span("mongo.assessments.find_one"):
+        assessment = await db.assessments.find_one({"id": assessment_id, "user_id": user_id}, {"_id": 0})
     if not assessment:
         raise HTTPException(status_code=404, detail="Assessment not found")
     
-    role = await db.career_roles.find_one({"id": assessment["career_role_id"]}, {"_id": 0})
+    with span("catalog.find_role"):
+        role = await find_role(assessment["career_role_id"])
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     
-    # AI Analysis
-    api_key = os.environ.get('EMERGENT_LLM_KEY')
-    chat = LlmChat(
-        api_key=api_key,
-        session_id=f"gap_analysis_{assessment_id}",
-        system_message="You are an expert career advisor and skill gap analyst. Provide detailed, actionable insights."
-    ).with_model("openai", "gpt-5.2")
-    
-    prompt = f"""Analyze the skill gap for a student targeting the {role['title']} role.
-
-Required Skills for {role['title']}:
-{chr(10).join([f"- {s['name']} ({s['level']}): {s['category']}" for s in role['required_skills']])}
-
-Student's Current Skills:
-{chr(10).join([f"- {s['skill_name']}: Level {s['current_level']}/5" for s in assessment['skills']])}
-
-Provide:
-1. Detailed skill gap analysis
-2. Priority areas for improvement
-3. Realistic timeline estimate
-4. Specific actionable advice
-
-Keep response under 300 words."""
-    
-    user_message = UserMessage(text=prompt)
-    ai_response = await chat.send_message(user_message)
-    
     # Calculate gaps and readiness
     skill_gaps = []
     total_required = len(role['required_skills'])
-    skills_dict = {s['skill_name']: s['current_level'] for s in assessment['skills']}
+    skills_dict = {}
+    for s in assessment['skills']:
+        skill_id = s.get('skill_id') or skill_taxonomy.resolve(s['skill_name'])
+        skills_dict[skill_id] = max(skills_dict.get(skill_id, 0), s['current_level'])
     
     readiness_sum = 0
     for req_skill in role['required_skills']:
-        current = skills_dict.get(req_skill['name'], 0)
+        current = skills_dict.get(req_skill.get('skill_id') or skill_taxonomy.resolve(req_skill['name']), 0)
         required = 3 if req_skill['level'] == 'Beginner' else 4 if req_skill['level'] == 'Intermediate' else 5
         gap = max(0, required - current)
         readiness_sum += min(current / required * 100, 100)
@@ -294,36 +471,72 @@ Keep response under 300 words."""
     
     readiness_score = round(readiness_sum / total_required, 1)
     
+    # AI Analysis (model tier chosen from the size of the gap computed above)
+    required_lines = [f"- {s['name']} ({s['level']}): {s['category']}" for s in role['required_skills']]
+    gap_skills = {g['skill'] for g in skill_gaps}
+    prompt = f"""Analyze the skill gap for a student targeting the {role['title']} role.
+
+Required Skills for {role['title']}:
+{chr(10).join(required_lines)}
+
+Student's Current Skills:
+{chr(10).join([f"- {s['skill_name']}: Level {s['current_level']}/5" for s in assessment['skills']])}
+
+Provide:
+1. Detailed skill gap analysis
+2. Priority areas for improvement
+3. Realistic timeline estimate
+4. Specific actionable advice
+
+Keep response under 300 words."""
+    
+    # Requirements the student already meets are the first thing dropped if the prompt must be trimmed.
+    ai_response = await llm_router.send(
+        db, "analysis/gap", user_id,
+        session_id=f"gap_analysis_{assessment_id}",
+        system_message="You are an expert career advisor and skill gap analyst. Provide detailed, actionable insights.",
+        prompt=prompt,
+        skill_gaps=skill_gaps,
+        optional_lines=[line for line, s in zip(required_lines, role['required_skills']) if s['name'] not in gap_skills]
+    )
+    
     analysis_dict = {
         "id": str(uuid.uuid4()),
         "user_id": user_id,
         "career_role_id": assessment["career_role_id"],
         "skill_gaps": skill_gaps,
         "readiness_score": readiness_score,
-        "ai_insights": ai_response,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "ai_insights_ref": await store_text(db, ai_response),
+        "created_at": datetime.now(timezone.utc)
     }
     
-    await db.gap_analyses.insert_one(analysis_dict)
-    return GapAnalysis(**analysis_dict)
+    with span("mongo.gap_analyses.insert_one"):
+        await db.gap_analyses.insert_one(analysis_dict)
+    with span("mongo.role_gap_stats.bulk_write"):
+        await record_gap_analysis(db, analysis_dict)
+    notify(user_id, "gap_analysis.created", analysis_dict)
+    readiness_sketches.add(assessment["career_role_id"], readiness_score)
+    percentile = readiness_sketches.percentile_rank(assessment["career_role_id"], readiness_score)
+    with span("pydantic.model"):
+        return GapAnalysis(**analysis_dict, ai_insights=ai_response, readiness_percentile=percentile)
 
 # Roadmap Generation Endpoint (AI-Powered)
 @api_router.post("/roadmap/generate", response_model=LearningRoadmap)
-async def generate_roadmap(analysis_id: str, user_id: str = Depends(get_current_user)):
+async def generate_roadmap(analysis_id: str, idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+                           user_id: str = Depends(get_current_user)):
+    if idempotency_key is None:
+        return await create_roadmap(analysis_id, user_id)
+    return await run_idempotent(db, user_id, "roadmap/generate", idempotency_key, {"analysis_id": analysis_id},
+                                lambda: create_roadmap(analysis_id, user_id))
+
+async def create_roadmap(analysis_id: str, user_id: str) -> LearningRoadmap:
     analysis = await db.gap_analyses.find_one({"id": analysis_id, "user_id": user_id}, {"_id": 0})
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
     
-    role = await db.career_roles.find_one({"id": analysis["career_role_id"]}, {"_id": 0})
+    role = await find_role(analysis["career_role_id"])
     
     # AI Roadmap Generation
-    api_key = os.environ.get('EMERGENT_LLM_KEY')
-    chat = LlmChat(
-        api_key=api_key,
-        session_id=f"roadmap_{analysis_id}",
-        system_message="You are an expert learning path designer. Create structured, realistic learning roadmaps."
-    ).with_model("openai", "gpt-5.2")
-    
     gaps_text = chr(10).join([f"- {g['skill']} (Gap: {g['gap']}, Priority: {g['priority']})" for g in analysis['skill_gaps']])
     
     prompt = f"""Create a detailed learning roadmap for a student targeting {role['title']}.
@@ -338,8 +551,13 @@ For each skill gap, provide:
 
 Format your response as a structured learning plan. Keep it actionable and motivating."""
     
-    user_message = UserMessage(text=prompt)
-    ai_recommendations = await chat.send_message(user_message)
+    ai_recommendations = await llm_router.send(
+        db, "roadmap/generate", user_id,
+        session_id=f"roadmap_{analysis_id}",
+        system_message="You are an expert learning path designer. Create structured, realistic learning roadmaps.",
+        prompt=prompt,
+        skill_gaps=analysis['skill_gaps']
+    )
     
     # Generate roadmap items
     roadmap_items = []
@@ -367,24 +585,143 @@ Format your response as a structured learning plan. Keep it actionable and motiv
         "career_role_id": analysis["career_role_id"],
         "roadmap_items": roadmap_items,
         "total_duration": f"{total_weeks} weeks (~{total_weeks//4} months)",
-        "ai_recommendations": ai_recommendations,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "ai_recommendations_ref": await store_text(db, ai_recommendations),
+        "created_at": datetime.now(timezone.utc)
     }
     
     await db.roadmaps.insert_one(roadmap_dict)
-    return LearningRoadmap(**roadmap_dict)
+    await bump_version(user_id, "roadmaps")
+    notify(user_id, "roadmap.created", roadmap_dict)
+    return LearningRoadmap(**roadmap_dict, ai_recommendations=ai_recommendations)
 
 @api_router.get("/roadmap", response_model=List[LearningRoadmap])
-async def get_roadmaps(user_id: str = Depends(get_current_user)):
-    roadmaps = await db.roadmaps.find({"user_id": user_id}, {"_id": 0}).to_list(100)
-    return roadmaps
+async def get_roadmaps(request: Request, response: Response, include_text: bool = True, since: Optional[datetime] = None,
+                       until: Optional[datetime] = None, user_id: str = Depends(get_current_user)):
+    if await history_validators(request, response, user_id, "roadmaps"):
+        return not_modified(response)
+    query = history_query(user_id, "created_at", since, until)
+    if not include_text:
+        # Lean listing: clients fetch /llm-texts/{ref} only for the roadmap they open.
+        roadmaps = await db.roadmaps.find(query, {"_id": 0, "ai_recommendations": 0}).sort("created_at", 1).to_list(100)
+        for roadmap in roadmaps:
+            roadmap["ai_recommendations"] = ""
+        return roadmaps
+    roadmaps = await db.roadmaps.find(query, {"_id": 0}).sort("created_at", 1).to_list(100)
+    return await expand_texts(db, roadmaps, "ai_recommendations")
+
+@api_router.get("/llm-texts/{ref}")
+async def get_llm_text(ref: str, user_id: str = Depends(get_current_user)):
+    # Texts are shared by hash, so access goes through a document of the caller's that references it.
+    owned = await db.gap_analyses.find_one({"user_id": user_id, "ai_insights_ref": ref}, {"_id": 1})
+    if not owned:
+        owned = await db.roadmaps.find_one({"user_id": user_id, "ai_recommendations_ref": ref}, {"_id": 1})
+    if not owned:
+        raise HTTPException(status_code=404, detail="Text not found")
+    texts = await load_texts(db, [ref])
+    if ref not in texts:
+        raise HTTPException(status_code=404, detail="Text not found")
+    return {"ref": ref, "text": texts[ref]}
+
+# Analytics Endpoints
+@api_router.get("/analytics/roles/{role_id}/gaps")
+async def get_role_gap_analytics(role_id: str, days: Optional[int] = None, user_id: str = Depends(get_current_user)):
+    if days is not None and not 1 <= days <= 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+    return await role_gap_summary(db, role_id, days)
+
+# Export Endpoints
+def export_response(kind: str, fmt: str, rows) -> StreamingResponse:
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{kind}.{fmt}"'}
+    )
+
+def check_export(kind: str, fmt: str):
+    if kind not in EXPORT_FIELDS:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+
+@api_router.get("/export/{kind}")
+async def export_my_history(kind: str, format: str = "ndjson", since: Optional[datetime] = None, until: Optional[datetime] = None,
+                            user_id: str = Depends(get_current_user)):
+    check_export(kind, format)
+    time_field = EXPORT_TIME_FIELDS[kind]
+    query = history_query(user_id, time_field, since, until)
+    return export_response(kind, format, stream_export(db[kind], query, EXPORT_FIELDS[kind], format, time_field))
+
+@api_router.get("/admin/export/{kind}")
+async def export_all_history(kind: str, format: str = "ndjson", career_role_id: Optional[str] = None,
+                             institution: Optional[str] = None, admin_id: str = Depends(get_admin_user)):
+    check_export(kind, format)
+    query = {"career_role_id": career_role_id} if career_role_id else {}
+    if institution:
+        # Ordered by time within each chunk of users, which the (user_id, time) index serves.
+        rows = stream_export_for_users(db[kind], db.users, {"institution": institution}, query, EXPORT_FIELDS[kind],
+                                       format, EXPORT_TIME_FIELDS[kind])
+    else:
+        rows = stream_export(db[kind], query, EXPORT_FIELDS[kind], format, "_id")
+    return export_response(kind, format, rows)
+
+# Provisioning Endpoint
+@api_router.post("/admin/users/provision", response_model=ProvisionResponse)
+async def provision_students(file: UploadFile = File(...), institution: Optional[str] = None, mode: str = "invites",
+                             admin_id: str = Depends(get_admin_user)):
+    """Create accounts from a CSV with name,email[,password] columns.
+
+    mode=invites returns generated passwords for rows without one; mode=tokens also returns a login token per account.
+    """
+    if mode not in ("invites", "tokens"):
+        raise HTTPException(status_code=400, detail="mode must be invites or tokens")
+    rows, errors = parse_students(await file.read())
+    created, insert_errors = await provision_users(db, rows, institution, check_existing=not email_index_ready)
+    if mode == "tokens":
+        for user in created:
+            user["token"] = create_token(user["id"])
+    return ProvisionResponse(created=created, errors=errors + insert_errors)
+
+# LLM Usage Endpoints
+@api_router.get("/admin/llm/usage")
+async def get_llm_usage(days: int = 7, admin_id: str = Depends(get_admin_user)):
+    if not 1 <= days <= 90:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 90")
+    return {"days": days, "routes": await usage_report(db, days)}
+
+@api_router.get("/admin/llm/usage/users/{target_user_id}")
+async def get_llm_user_usage(target_user_id: str, admin_id: str = Depends(get_admin_user)):
+    totals = await db.llm_usage_totals.find_one({"_id": target_user_id}, {"_id": 0})
+    return {"user_id": target_user_id, **(totals or {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0})}
+
+# Profiling Endpoint
+profiler = SamplingProfiler()
+
+@api_router.post("/admin/profile", response_class=PlainTextResponse)
+async def profile_server(seconds: float = 10, interval_ms: float = 5, admin_id: str = Depends(get_admin_user)):
+    if not 0 < seconds <= 60 or not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="seconds must be in (0, 60] and interval_ms in [1, 1000]")
+    try:
+        folded = await profiler.profile_event_loop(seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(folded)
 
 # Resources Endpoints
 @api_router.get("/resources", response_model=List[LearningResource])
 async def get_resources(skill: Optional[str] = None, difficulty: Optional[str] = None):
+    skill_id = skill_taxonomy.resolve(skill) if skill else None
+    snapshot = catalog.current() if catalog else None
+    if snapshot:
+        # Every existing (skill, difficulty) pair is pre-rendered; a miss means no matches.
+        for key in [skill_id, skill] if skill else [""]:
+            raw = snapshot.get("resources_by", f"{key}\x00{difficulty or ''}".encode())
+            if raw is not None:
+                return Response(content=raw, media_type="application/json")
+        return []
+
     query = {}
     if skill:
-        query["skills"] = skill
+        query["$or"] = [{"skills": skill}, {"skill_ids": skill_id}]
     if difficulty:
         query["difficulty"] = difficulty
     
@@ -394,36 +731,55 @@ async def get_resources(skill: Optional[str] = None, difficulty: Optional[str] =
 # Progress Endpoints
 @api_router.post("/progress", response_model=Progress)
 async def update_progress(progress_data: ProgressUpdate, career_role_id: str, user_id: str = Depends(get_current_user)):
+    skill_id = skill_taxonomy.resolve(progress_data.skill)
+    if progress_buffer:
+        # Acknowledge from the buffer; the background flush persists it.
+        buffered = await progress_buffer.update(user_id, career_role_id, {
+            "skill": progress_data.skill,
+            "skill_id": skill_id,
+            "progress": progress_data.progress,
+            "notes": progress_data.notes,
+            "updated_at": datetime.now(timezone.utc)
+        })
+        notify(user_id, "progress.updated", buffered)
+        return Progress(**buffered)
+
     existing = await db.progress.find_one({"user_id": user_id, "career_role_id": career_role_id}, {"_id": 0})
+    event = {"skill": progress_data.skill, "skill_id": skill_id, "progress": progress_data.progress, "updated_at": datetime.now(timezone.utc)}
     
     if existing:
         # Update existing progress
         skill_progress = existing.get('skill_progress', [])
         found = False
         for sp in skill_progress:
-            if sp['skill'] == progress_data.skill:
+            if (sp.get('skill_id') or skill_taxonomy.resolve(sp['skill'])) == skill_id:
+                sp['skill_id'] = skill_id
                 sp['progress'] = progress_data.progress
                 sp['notes'] = progress_data.notes
-                sp['updated_at'] = datetime.now(timezone.utc).isoformat()
+                sp['updated_at'] = datetime.now(timezone.utc)
                 found = True
                 break
         
         if not found:
             skill_progress.append({
                 "skill": progress_data.skill,
+                "skill_id": skill_id,
                 "progress": progress_data.progress,
                 "notes": progress_data.notes,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             })
         
         overall = sum(sp['progress'] for sp in skill_progress) // len(skill_progress) if skill_progress else 0
         
         await db.progress.update_one(
             {"user_id": user_id, "career_role_id": career_role_id},
-            {"$set": {"skill_progress": skill_progress, "overall_progress": overall, "updated_at": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {"skill_progress": skill_progress, "overall_progress": overall, "updated_at": datetime.now(timezone.utc)}}
         )
         
+        await bump_version(user_id, "progress")
+        await record_progress(db, user_id, career_role_id, [event])
         updated = await db.progress.find_one({"user_id": user_id, "career_role_id": career_role_id}, {"_id": 0})
+        notify(user_id, "progress.updated", updated)
         return Progress(**updated)
     else:
         # Create new progress
@@ -433,25 +789,79 @@ async def update_progress(progress_data: ProgressUpdate, career_role_id: str, us
             "career_role_id": career_role_id,
             "skill_progress": [{
                 "skill": progress_data.skill,
+                "skill_id": skill_id,
                 "progress": progress_data.progress,
                 "notes": progress_data.notes,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             }],
             "overall_progress": progress_data.progress,
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "updated_at": datetime.now(timezone.utc)
         }
         
         await db.progress.insert_one(progress_dict)
+        await bump_version(user_id, "progress")
+        await record_progress(db, user_id, career_role_id, [event])
+        notify(user_id, "progress.updated", progress_dict)
         return Progress(**progress_dict)
 
+@api_router.get("/progress/history")
+async def get_progress_history(career_role_id: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                               points: int = 50, user_id: str = Depends(get_current_user)):
+    if not 1 <= points <= 500:
+        raise HTTPException(status_code=400, detail="points must be between 1 and 500")
+    since = since.replace(tzinfo=timezone.utc) if since and not since.tzinfo else since
+    until = until.replace(tzinfo=timezone.utc) if until and not until.tzinfo else until
+    if since and until and since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    return await progress_series(db, user_id, career_role_id, since, until, points)
+
 @api_router.get("/progress", response_model=List[Progress])
-async def get_progress(user_id: str = Depends(get_current_user)):
-    progress = await db.progress.find({"user_id": user_id}, {"_id": 0}).to_list(100)
+async def get_progress(request: Request, response: Response, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                       user_id: str = Depends(get_current_user)):
+    # The stored version does not cover buffered writes, so never answer 304 while some are pending.
+    buffered = progress_buffer is not None and progress_buffer.has_pending(user_id)
+    if await history_validators(request, response, user_id, "progress") and not buffered:
+        return not_modified(response)
+    query = history_query(user_id, "updated_at", since, until)
+    progress = await db.progress.find(query, {"_id": 0}).sort("updated_at", 1).to_list(100)
+    if buffered and not (since or until):
+        progress = progress_buffer.overlay(user_id, progress)
     return progress
 
+# Push Endpoint
+@api_router.websocket("/ws")
+async def push_updates(websocket: WebSocket):
+    # Browsers cannot set headers on WebSocket requests. The JWT comes as the first message,
+    # not in the URL where access logs would record it; rejections happen after accept() so
+    # the client sees close code 4401 instead of a failed handshake.
+    await websocket.accept()
+    try:
+        message = await asyncio.wait_for(websocket.receive_text(), timeout=PUSH_AUTH_TIMEOUT_SECONDS)
+        user_id = decode_token(json.loads(message)["token"])
+    except WebSocketDisconnect:
+        return
+    except (asyncio.TimeoutError, HTTPException, ValueError, KeyError, TypeError):
+        await websocket.close(code=4401)
+        return
+    await websocket.send_json({"type": "ready"})
+    await push_hub.serve(websocket, user_id)
+
 # Include router
 app.include_router(api_router)
 
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.environ.get('COMPRESSION_MIN_SIZE', '1024')))
+
+app.add_middleware(
+    RateLimitMiddleware,
+    policies=RATE_LIMIT_POLICIES,
+    user_key=rate_limit_user_key,
+    shared_store=MongoWindowStore(db.rate_limits) if RATE_LIMIT_SHARED else None,
+    trusted_proxies=RATE_LIMIT_TRUSTED_PROXIES,
+    exempt=rate_limit_exempt,
+)
+
+app.add_middleware(TracingMiddleware, slow_ms=float(os.environ.get('TRACE_SLOW_REQUEST_MS', '500')))
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -466,6 +876,77 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    global email_index_ready
+    email_index_ready = await ensure_email_index(db)
+    await db.users.create_index("id", unique=True)
+    await db.users.create_index("institution", sparse=True)
+    await db.user_versions.create_index("user_id", unique=True)
+    await db.assessments.create_index([("user_id", 1), ("created_at", 1)])
+    await db.gap_analyses.create_index([("user_id", 1), ("created_at", 1)])
+    await db.roadmaps.create_index([("user_id", 1), ("created_at", 1)])
+    await db.progress.create_index([("user_id", 1), ("updated_at", 1)])
+    await db.role_gap_stats.create_index([("role_id", 1), ("day", 1)])
+    await db.resources.create_index("skill_ids")
+    await db.progress_history.create_index([("user_id", 1), ("career_role_id", 1), ("week", 1)])
+    await db.idempotency_keys.create_index("expires_at", expireAfterSeconds=0)
+    await db.llm_usage.create_index("created_at")
+
+@app.on_event("startup")
+async def compile_skill_taxonomy():
+    global skill_taxonomy
+    skill_taxonomy = await load_taxonomy(db)
+
+@app.on_event("startup")
+async def start_readiness_sketches():
+    await readiness_sketches.refresh(db)
+    app.state.readiness_sync = asyncio.create_task(readiness_sketches.run(db, READINESS_SKETCH_SYNC_SECONDS))
+
+@app.on_event("shutdown")
+async def flush_readiness_sketches():
+    app.state.readiness_sync.cancel()
+    try:
+        await app.state.readiness_sync
+    except asyncio.CancelledError:
+        pass
+    await readiness_sketches.flush(db)
+
+@app.on_event("startup")
+async def start_progress_buffer():
+    if progress_buffer:
+        app.state.progress_flush = asyncio.create_task(progress_buffer.run())
+
+@app.on_event("shutdown")
+async def flush_progress_buffer():
+    if progress_buffer:
+        # Let a cancelled in-flight flush put its batch back before the final flush.
+        app.state.progress_flush.cancel()
+        try:
+            await app.state.progress_flush
+        except asyncio.CancelledError:
+            pass
+        await progress_buffer.flush()
+
+@app.on_event("startup")
+async def start_push_feeder():
+    if PUSH_CHANGE_STREAM:
+        push_hub.start_change_stream(db)
+
+@app.on_event("shutdown")
+async def stop_push_feeder():
+    if push_hub.feeder:
+        push_hub.feeder.cancel()
+
+@app.on_event("startup")
+async def publish_catalog_if_missing():
+    if CATALOG_SNAPSHOT_PATH and not Path(CATALOG_SNAPSHOT_PATH).exists():
+        # An empty snapshot would shadow the Mongo fallback until someone republishes by hand.
+        if not await db.career_roles.count_documents({}, limit=1):
+            logger.warning("Catalog is empty; not publishing %s until it is seeded", CATALOG_SNAPSHOT_PATH)
+            return
+        await publish_catalog_snapshot(db, Path(CATALOG_SNAPSHOT_PATH))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
\ No newline at end of file
@@ -0,0 +1,210 @@
+"""Skill taxonomy: resolves free-form skill names to canonical skill ids.
+
+The taxonomy is compiled once into a hash map from normalized alias to canonical id,
+plus a character-trigram index used only when the exact lookup misses. Fuzzy matches
+are limited to typos: the whole name must be within a small edit distance of one
+alias, so "Pyhton" finds Python but "Testing" does not find "Pen Testing". Names that
+match nothing resolve to their own normalized form, so unknown skills still compare
+equal to themselves.
+"""
+import os
+import re
+import asyncio
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from pymongo import UpdateOne
+
+BUILTIN_TAXONOMY = [
+    {"id": "html-css", "name": "HTML/CSS", "aliases": ["HTML", "CSS", "HTML5", "CSS3", "HTML & CSS"]},
+    {"id": "javascript", "name": "JavaScript", "aliases": ["JS", "ECMAScript", "ES6", "Vanilla JS"]},
+    {"id": "typescript", "name": "TypeScript", "aliases": ["TS"]},
+    {"id": "react", "name": "React", "aliases": ["ReactJS", "React.js", "React JS"]},
+    {"id": "nodejs", "name": "Node.js", "aliases": ["Node", "NodeJS", "Node JS"]},
+    {"id": "rest-apis", "name": "REST APIs", "aliases": ["REST", "REST API", "RESTful APIs", "RESTful"]},
+    {"id": "mongodb", "name": "MongoDB", "aliases": ["Mongo"]},
+    {"id": "sql", "name": "SQL", "aliases": ["Postgres", "PostgreSQL", "MySQL", "SQLite", "T-SQL", "Relational Databases"]},
+    {"id": "git", "name": "Git", "aliases": ["GitHub", "Version Control"]},
+    {"id": "python", "name": "Python", "aliases": ["Python3", "Python 3"]},
+    {"id": "statistics", "name": "Statistics", "aliases": ["Stats", "Statistical Analysis"]},
+    {"id": "machine-learning", "name": "Machine Learning", "aliases": ["ML"]},
+    {"id": "deep-learning", "name": "Deep Learning", "aliases": ["DL", "Neural Networks"]},
+    {"id": "data-visualization", "name": "Data Visualization", "aliases": ["Data Viz", "Dataviz", "Visualization"]},
+    {"id": "pandas-numpy", "name": "Pandas/NumPy", "aliases": ["Pandas", "NumPy"]},
+    {"id": "figma", "name": "Figma", "aliases": []},
+    {"id": "user-research", "name": "User Research", "aliases": ["UX Research"]},
+    {"id": "wireframing", "name": "Wireframing", "aliases": ["Wireframes"]},
+    {"id": "prototyping", "name": "Prototyping", "aliases": ["Prototypes"]},
+    {"id": "visual-design", "name": "Visual Design", "aliases": ["UI Design", "Graphic Design"]},
+    {"id": "design-systems", "name": "Design Systems", "aliases": ["Design System"]},
+    {"id": "cloud-platforms", "name": "AWS/Azure/GCP", "aliases": ["AWS", "Azure", "GCP", "Google Cloud", "Cloud Computing"]},
+    {"id": "linux", "name": "Linux", "aliases": ["Unix", "Bash", "Shell"]},
+    {"id": "docker", "name": "Docker", "aliases": ["Containers", "Containerization"]},
+    {"id": "kubernetes", "name": "Kubernetes", "aliases": ["K8s"]},
+    {"id": "ci-cd", "name": "CI/CD", "aliases": ["CI", "CD", "Continuous Integration", "Continuous Delivery", "GitHub Actions", "Jenkins"]},
+    {"id": "networking", "name": "Networking", "aliases": ["Computer Networks", "TCP/IP"]},
+    {"id": "security", "name": "Security", "aliases": ["Infosec", "Information Security"]},
+    {"id": "cross-platform-mobile", "name": "React Native/Flutter", "aliases": ["React Native", "Flutter"]},
+    {"id": "javascript-dart", "name": "JavaScript/Dart", "aliases": ["Dart"]},
+    {"id": "mobile-ui-ux", "name": "Mobile UI/UX", "aliases": ["Mobile Design", "Mobile UX"]},
+    {"id": "state-management", "name": "State Management", "aliases": ["Redux", "MobX", "Bloc"]},
+    {"id": "app-store-publishing", "name": "App Store Publishing", "aliases": ["App Publishing", "Play Store Publishing"]},
+    {"id": "mobile-testing", "name": "Mobile Testing", "aliases": ["App Testing"]},
+    {"id": "network-security", "name": "Network Security", "aliases": ["Firewalls"]},
+    {"id": "ethical-hacking", "name": "Ethical Hacking", "aliases": ["Penetration Testing", "Pentesting", "Pen Testing"]},
+    {"id": "security-tools", "name": "Security Tools", "aliases": ["Wireshark", "Nmap", "Metasploit"]},
+    {"id": "incident-response", "name": "Incident Response", "aliases": ["IR"]},
+    {"id": "risk-assessment", "name": "Risk Assessment", "aliases": ["Risk Management"]},
+    {"id": "cryptography", "name": "Cryptography", "aliases": ["Crypto", "Encryption"]},
+    {"id": "compliance", "name": "Compliance", "aliases": ["GDPR", "ISO 27001", "SOC 2"]},
+]
+
+FUZZY_MIN_LENGTH = 5  # shorter names are abbreviations more often than typos
+FUZZY_PREFIX = 2  # typos rarely hit the first letters; "UX Design" is not "UI Design"
+_NON_WORD = re.compile(r"[^a-z0-9+#]+")
+
+
+def normalize(name: str) -> str:
+    """Case, spacing and punctuation-insensitive key: "React.js " -> "reactjs"."""
+    return _NON_WORD.sub("", name.lower())
+
+
+def max_typos(length: int) -> int:
+    if length < FUZZY_MIN_LENGTH:
+        return 0
+    return 1 if length < 9 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance counting adjacent transpositions as one edit; returns limit + 1 past limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SkillTaxonomy:
+    def __init__(self, entries: Iterable[dict]):
+        self.names: Dict[str, str] = {}
+        self.exact: Dict[str, str] = {}
+        self.trigram_index: Dict[str, Set[str]] = {}
+        for entry in entries:
+            self.names[entry["id"]] = entry["name"]
+            for alias in [entry["name"], entry["id"], *entry.get("aliases", [])]:
+                key = normalize(alias)
+                if not key:
+                    continue
+                self.exact.setdefault(key, entry["id"])
+                for gram in trigrams(key):
+                    self.trigram_index.setdefault(gram, set()).add(key)
+        self._fuzzy = lru_cache(maxsize=4096)(self._fuzzy_lookup)
+
+    def resolve(self, name: str) -> str:
+        key = normalize(name)
+        found = self.exact.get(key)
+        if found is not None:
+            return found
+        return self._fuzzy(key) or key
+
+    def _fuzzy_lookup(self, key: str) -> Optional[str]:
+        limit = max_typos(len(key))
+        if not limit:
+            return None
+        # The trigram index only narrows the candidates; the edit distance decides.
+        candidates = {c for gram in trigrams(key) for c in self.trigram_index.get(gram, ())}
+        best: Set[str] = set()
+        best_distance = limit + 1
+        for candidate in candidates:
+            # Both names must be long enough for the edits, which also bounds their length ratio.
+            allowed = min(limit, max_typos(len(candidate)))
+            if not allowed or candidate[:FUZZY_PREFIX] != key[:FUZZY_PREFIX]:
+                continue
+            distance = edit_distance(key, candidate, allowed)
+            if distance > allowed:
+                continue
+            if distance < best_distance:
+                best, best_distance = {self.exact[candidate]}, distance
+            elif distance == best_distance:
+                best.add(self.exact[candidate])
+        # A typo equally close to two different skills is not resolved at all.
+        return best.pop() if len(best) == 1 else None
+
+    def resolve_all(self, names: List[str]) -> List[str]:
+        return list(dict.fromkeys(self.resolve(n) for n in names))
+
+
+async def load_taxonomy(db) -> SkillTaxonomy:
+    """Built-in entries plus any custom ones in the skill_taxonomy collection."""
+    custom = await db.skill_taxonomy.find({}, {"_id": 0}).to_list(None)
+    return SkillTaxonomy(BUILTIN_TAXONOMY + custom)
+
+
+async def renormalize(db, taxonomy: SkillTaxonomy, batch_size: int = 1000) -> Dict[str, int]:
+    """Write canonical skill ids onto every stored skill reference."""
+
+    def assessment_update(doc):
+        return {"skills": [{**s, "skill_id": taxonomy.resolve(s["skill_name"])} for s in doc.get("skills", [])]}
+
+    def role_update(doc):
+        return {"required_skills": [{**s, "skill_id": taxonomy.resolve(s["name"])} for s in doc.get("required_skills", [])]}
+
+    def resource_update(doc):
+        return {"skill_ids": taxonomy.resolve_all(doc.get("skills", []))}
+
+    def progress_update(doc):
+        return {"skill_progress": [{**sp, "skill_id": taxonomy.resolve(sp["skill"])} for sp in doc.get("skill_progress", [])]}
+
+    jobs = {
+        "assessments": ({"skills": 1}, assessment_update),
+        "career_roles": ({"required_skills": 1}, role_update),
+        "resources": ({"skills": 1}, resource_update),
+        "progress": ({"skill_progress": 1}, progress_update),
+    }
+    updated = {}
+    for collection_name, (projection, build) in jobs.items():
+        collection = db[collection_name]
+        ops = []
+        updated[collection_name] = 0
+        async for doc in collection.find({}, projection).batch_size(batch_size):
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": build(doc)}))
+            if len(ops) >= batch_size:
+                await collection.bulk_write(ops, ordered=False)
+                updated[collection_name] += len(ops)
+                ops = []
+        if ops:
+            await collection.bulk_write(ops, ordered=False)
+            updated[collection_name] += len(ops)
+    return updated
+
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    updated = await renormalize(db, await load_taxonomy(db))
+    for name, count in updated.items():
+        print(f"Re-normalized {count} {name} documents")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
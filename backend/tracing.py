@@ -0,0 +1,120 @@
+"""Per-request span tracing and an on-demand sampling profiler.
+
+A Trace is bound to the request through a contextvar, so spans opened anywhere in
+the async call chain (including tasks spawned from the request) land in it.
+Requests slower than the threshold are written to the "trace" logger as one JSON line.
+"""
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+trace_logger = logging.getLogger("trace")
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+
+
+class Trace:
+    __slots__ = ("id", "method", "path", "started", "spans")
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.spans: List[tuple] = []
+
+    def to_dict(self, status: int) -> dict:
+        return {
+            "trace_id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "spans": [
+                {"name": name, "start_ms": round((start - self.started) * 1000, 2), "duration_ms": round(duration * 1000, 2)}
+                for name, start, duration in self.spans
+            ],
+        }
+
+
+@contextmanager
+def span(name: str):
+    """Time a stage of the current request. A no-op outside a traced request."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans.append((name, start, time.perf_counter() - start))
+
+
+class TracingMiddleware:
+    def __init__(self, app, slow_ms: float = 500):
+        self.app = app
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trace = Trace(scope["method"], scope["path"])
+        token = _current_trace.set(trace)
+        status = 500
+
+        async def traced_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", []).append((b"x-trace-id", trace.id.encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, traced_send)
+        finally:
+            _current_trace.reset(token)
+            if (time.perf_counter() - trace.started) * 1000 >= self.slow_ms:
+                trace_logger.warning(json.dumps(trace.to_dict(status)))
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval and returns folded stacks.
+
+    The output ("frame;frame;frame count" per line) feeds flamegraph.pl and speedscope directly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def sample(self, thread_id: int, seconds: float, interval: float) -> str:
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            stacks: Counter = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(thread_id)
+                if frame is not None:
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                        frame = frame.f_back
+                    stacks[";".join(reversed(stack))] += 1
+                time.sleep(interval)
+            return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+        finally:
+            self._lock.release()
+
+    async def profile_event_loop(self, seconds: float, interval: float = 0.005) -> str:
+        """Profile the thread running the current event loop from a helper thread."""
+        return await asyncio.to_thread(self.sample, threading.get_ident(), seconds, interval)
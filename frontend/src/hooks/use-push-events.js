@@ -0,0 +1,56 @@
+import { useEffect, useRef } from 'react';
+import { API } from '@/App';
+
+const RECONNECT_DELAY_MS = 3000;
+const MAX_RECONNECT_DELAY_MS = 60000;
+const MAX_FAILED_ATTEMPTS = 5;
+const PING_INTERVAL_MS = 30000;
+const UNAUTHORIZED = 4401;
+
+// Subscribes to /api/ws and calls onEvent for every pushed change event.
+export function usePushEvents(token, onEvent) {
+  const handlerRef = useRef(onEvent);
+  handlerRef.current = onEvent;
+
+  useEffect(() => {
+    if (!token) return undefined;
+    let socket;
+    let pingTimer;
+    let reconnectTimer;
+    let closed = false;
+    let failures = 0;
+
+    const connect = () => {
+      socket = new WebSocket(`${API.replace(/^http/, 'ws')}/ws`);
+      socket.onopen = () => {
+        // The token goes in the first message so it never appears in a URL.
+        socket.send(JSON.stringify({ type: 'auth', token }));
+        pingTimer = setInterval(() => socket.send('ping'), PING_INTERVAL_MS);
+      };
+      socket.onmessage = (message) => {
+        const event = JSON.parse(message.data);
+        if (event.type === 'ready') {
+          failures = 0;
+        } else if (event.type !== 'pong') {
+          handlerRef.current(event);
+        }
+      };
+      socket.onclose = (event) => {
+        clearInterval(pingTimer);
+        failures += 1;
+        // Give up on a rejected token or a server that keeps refusing us; a new token restarts the hook.
+        if (closed || event.code === UNAUTHORIZED || failures >= MAX_FAILED_ATTEMPTS) return;
+        const delay = Math.min(RECONNECT_DELAY_MS * 2 ** (failures - 1), MAX_RECONNECT_DELAY_MS);
+        reconnectTimer = setTimeout(connect, delay);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearInterval(pingTimer);
+      clearTimeout(reconnectTimer);
+      socket.close();
+    };
+  }, [token]);
+}
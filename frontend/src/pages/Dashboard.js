@@ -5,6 +5,7 @@ import { TrendingUp, Target, Award, BookOpen, ArrowRight } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import Layout from '@/components/Layout';
 import { API, AuthContext } from '@/App';
+import { usePushEvents } from '@/hooks/use-push-events';
 
 const Dashboard = () => {
   const navigate = useNavigate();
@@ -17,6 +18,10 @@ const Dashboard = () => {
     fetchData();
   }, []);
 
+  usePushEvents(token, (event) => {
+    if (event.type === 'progress.updated') fetchData();
+  });
+
   const fetchData = async () => {
     try {
       const [assessmentsRes, progressRes] = await Promise.all([
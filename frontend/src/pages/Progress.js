@@ -3,6 +3,7 @@ import { motion } from 'framer-motion';
 import { TrendingUp, Award, CheckCircle2 } from 'lucide-react';
 import Layout from '@/components/Layout';
 import { API, AuthContext } from '@/App';
+import { usePushEvents } from '@/hooks/use-push-events';
 import { toast } from 'sonner';
 
 const Progress = () => {
@@ -15,6 +16,10 @@ const Progress = () => {
     fetchData();
   }, []);
 
+  usePushEvents(token, (event) => {
+    if (event.type === 'progress.updated') fetchData();
+  });
+
   const fetchData = async () => {
     try {
       const [progressRes, rolesRes] = await Promise.all([
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The backend runs as `uvicorn server:app` from backend/, so its modules import each other top-level.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
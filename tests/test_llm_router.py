@@ -0,0 +1,81 @@
+import pytest
+
+from llm_router import CHARS_PER_TOKEN, DEFAULT_RULES, DEFAULT_TIERS, LlmRouter, estimate_tokens, trim_prompt
+
+INSTRUCTIONS = "Provide:\n1. Detailed skill gap analysis\n2. Priority areas\n\nKeep response under 300 words."
+
+
+def gap_prompt(n_required: int, n_student: int) -> str:
+    required = "\n".join(f"- Required Skill {i} (Intermediate): Category" for i in range(n_required))
+    student = "\n".join(f"- Student Skill {i}: Level 2/5" for i in range(n_student))
+    return (f"Analyze the skill gap.\n\nRequired Skills:\n{required}\n\n"
+            f"Student's Current Skills:\n{student}\n\n{INSTRUCTIONS}")
+
+
+def test_prompt_within_budget_is_unchanged():
+    prompt = gap_prompt(3, 3)
+    assert trim_prompt(prompt, estimate_tokens(prompt)) == prompt
+
+
+def test_trimming_keeps_every_section_and_the_instructions():
+    prompt = gap_prompt(20, 20)
+    trimmed = trim_prompt(prompt, 200)
+    assert len(trimmed) <= 200 * CHARS_PER_TOKEN
+    assert trimmed.endswith(INSTRUCTIONS)
+    assert "Student's Current Skills:" in trimmed
+    assert "- Required Skill 0 " in trimmed
+    assert "- Student Skill 0:" in trimmed
+
+
+def test_trimming_is_proportional_and_notes_what_was_omitted():
+    trimmed = trim_prompt(gap_prompt(20, 20), 200)
+    kept_required = trimmed.count("- Required Skill")
+    kept_student = trimmed.count("- Student Skill")
+    assert abs(kept_required - kept_student) <= 1
+    assert f"- ... {20 - kept_required} more omitted" in trimmed
+    assert f"- ... {20 - kept_student} more omitted" in trimmed
+
+
+def test_optional_items_are_dropped_first():
+    prompt = gap_prompt(20, 5)
+    met = [f"- Required Skill {i} (Intermediate): Category" for i in range(10, 20)]
+    trimmed = trim_prompt(prompt, estimate_tokens(prompt) - 30, optional=met)
+    assert trimmed.count("- Student Skill") == 5
+    assert "- Required Skill 9 " in trimmed
+    assert "- Required Skill 19 " not in trimmed
+
+
+def test_unfittable_prompt_is_not_sliced():
+    trimmed = trim_prompt(gap_prompt(5, 5), 10)
+    assert trimmed.endswith(INSTRUCTIONS)
+    assert "- ... 5 more omitted" in trimmed
+
+
+@pytest.fixture
+def router():
+    return LlmRouter(DEFAULT_TIERS, DEFAULT_RULES)
+
+
+def test_small_gap_analysis_uses_fast_tier(router):
+    assert router.choose("analysis/gap", prompt_tokens=400, gaps=2, total_gap=4).name == "fast"
+
+
+def test_large_gap_or_prompt_uses_standard_tier(router):
+    assert router.choose("analysis/gap", prompt_tokens=400, gaps=4, total_gap=4).name == "standard"
+    assert router.choose("analysis/gap", prompt_tokens=2000, gaps=1, total_gap=1).name == "standard"
+
+
+def test_roadmap_rule_checks_total_gap(router):
+    assert router.choose("roadmap/generate", prompt_tokens=100, gaps=3, total_gap=6).name == "fast"
+    assert router.choose("roadmap/generate", prompt_tokens=100, gaps=3, total_gap=7).name == "standard"
+
+
+def test_unknown_route_falls_back_to_last_rule(router):
+    assert router.choose("other", prompt_tokens=1, gaps=0, total_gap=0).name == "standard"
+
+
+def test_rules_are_evaluated_in_order():
+    rules = [{"route": "analysis/gap", "tier": "standard"}, {"tier": "fast"}]
+    router = LlmRouter(DEFAULT_TIERS, rules)
+    assert router.choose("analysis/gap", prompt_tokens=1, gaps=0, total_gap=0).name == "standard"
+    assert router.choose("roadmap/generate", prompt_tokens=1, gaps=0, total_gap=0).name == "fast"
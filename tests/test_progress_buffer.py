@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timezone
+
+from progress_buffer import ProgressWriteBehind
+
+
+class FakeProgress:
+    """progress collection whose bulk_write blocks until released."""
+
+    def __init__(self, doc=None):
+        self.doc = doc
+        self.release = asyncio.Event()
+        self.writes = 0
+
+    async def find_one(self, query, projection=None):
+        return self.doc
+
+    async def bulk_write(self, ops, ordered=True):
+        await self.release.wait()
+        self.writes += 1
+
+
+class FakeDb:
+    def __init__(self, doc=None):
+        self.progress = FakeProgress(doc)
+
+
+def entry(skill, progress, skill_id=None):
+    return {"skill": skill, "skill_id": skill_id or skill.lower(), "progress": progress, "notes": "",
+            "updated_at": datetime.now(timezone.utc)}
+
+
+def skills(doc):
+    return sorted((sp["skill"], sp["progress"]) for sp in doc["skill_progress"])
+
+
+def test_inflight_batch_stays_visible():
+    async def scenario():
+        db = FakeDb()
+        buffer = ProgressWriteBehind(db, interval=1)
+        await buffer.update("u", "r", entry("A", 90))
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+
+        assert buffer.has_pending("u")
+        acked = await buffer.update("u", "r", entry("B", 10))
+        assert skills(acked) == [("A", 90), ("B", 10)]
+        assert acked["overall_progress"] == 50
+        assert skills(buffer.overlay("u", [])[0]) == [("A", 90), ("B", 10)]
+
+        db.progress.release.set()
+        await flush
+        assert buffer.has_pending("u")  # B is still buffered
+        await buffer.flush()
+        assert not buffer.has_pending("u")
+        assert db.progress.writes == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_write_restores_batch():
+    async def scenario():
+        db = FakeDb()
+
+        async def failing(ops, ordered=True):
+            raise RuntimeError("down")
+
+        db.progress.bulk_write = failing
+        buffer = ProgressWriteBehind(db, interval=1)
+        await buffer.update("u", "r", entry("A", 90))
+        try:
+            await buffer.flush()
+        except RuntimeError:
+            pass
+        assert skills(buffer.view(("u", "r"))) == [("A", 90)]
+        assert not buffer.inflight
+
+    asyncio.run(scenario())
+
+
+def test_legacy_names_resolve_through_taxonomy():
+    async def scenario():
+        legacy = {"id": "p1", "user_id": "u", "career_role_id": "r",
+                  "skill_progress": [{"skill": "ReactJS", "progress": 20}, {"skill": "Git", "progress": 40}]}
+        aliases = {"reactjs": "react", "react": "react", "git": "git"}
+        buffer = ProgressWriteBehind(FakeDb(legacy), interval=1, resolve=lambda name: aliases[name.lower()])
+        acked = await buffer.update("u", "r", entry("React", 80, skill_id="react"))
+        assert skills(acked) == [("Git", 40), ("React", 80)]
+        assert acked["overall_progress"] == 60
+
+    asyncio.run(scenario())
@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+
+import rate_limit
+from rate_limit import RateLimitMiddleware, RateLimitPolicy, TokenBucketStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", fake)
+    return fake
+
+
+def test_take_allows_burst_then_rejects(clock):
+    store = TokenBucketStore()
+    assert [store.take("k", rate=1, burst=3) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.take("k", rate=1, burst=3) == pytest.approx(1.0)
+
+
+def test_take_refills_over_time(clock):
+    store = TokenBucketStore()
+    for _ in range(2):
+        store.take("k", rate=0.5, burst=2)
+    assert store.take("k", rate=0.5, burst=2) == pytest.approx(2.0)
+    clock.now += 1
+    assert store.take("k", rate=0.5, burst=2) == pytest.approx(1.0)
+    clock.now += 1
+    assert store.take("k", rate=0.5, burst=2) == 0.0
+
+
+def test_take_refill_is_capped_at_burst(clock):
+    store = TokenBucketStore()
+    store.take("k", rate=1, burst=2)
+    clock.now += 3600
+    assert [store.take("k", rate=1, burst=2) for _ in range(3)] == [0.0, 0.0, pytest.approx(1.0)]
+
+
+def test_buckets_are_per_key(clock):
+    store = TokenBucketStore()
+    assert store.take("a", rate=1, burst=1) == 0.0
+    assert store.take("a", rate=1, burst=1) > 0
+    assert store.take("b", rate=1, burst=1) == 0.0
+
+
+def call(middleware, client="203.0.113.5", headers=()):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/auth/login", "client": (client, 12345),
+             "headers": [(name.encode(), value.encode()) for name, value in headers]}
+    asyncio.run(middleware(scope, None, send))
+    return sent
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def login_limiter(**kwargs):
+    policy = RateLimitPolicy("POST", "/api/auth/login", scope="ip", rate=10 / 60, burst=2)
+    return RateLimitMiddleware(ok_app, [policy], user_key=lambda header: None, **kwargs)
+
+
+def test_rejection_sets_retry_after(clock):
+    middleware = login_limiter()
+    assert call(middleware)[0]["status"] == 200
+    assert call(middleware)[0]["status"] == 200
+    start = call(middleware)[0]
+    assert start["status"] == 429
+    # One token at 10/min takes 6 seconds; the header is rounded up to whole seconds.
+    assert dict(start["headers"])[b"retry-after"] == b"6"
+    clock.now += 5.5
+    assert dict(call(middleware)[0]["headers"])[b"retry-after"] == b"1"
+
+
+def test_forwarded_for_ignored_from_untrusted_peer(clock):
+    middleware = login_limiter()
+    for forwarded in ("198.51.100.1", "198.51.100.2"):
+        call(middleware, headers=[("x-forwarded-for", forwarded)])
+    assert call(middleware, headers=[("x-forwarded-for", "198.51.100.3")])[0]["status"] == 429
+
+
+def test_forwarded_for_from_trusted_proxy_separates_clients(clock):
+    middleware = login_limiter(trusted_proxies=["10.0.0.0/8"])
+    for _ in range(2):
+        assert call(middleware, client="10.1.2.3", headers=[("x-forwarded-for", "198.51.100.1")])[0]["status"] == 200
+    assert call(middleware, client="10.1.2.3", headers=[("x-forwarded-for", "198.51.100.1")])[0]["status"] == 429
+    assert call(middleware, client="10.1.2.3", headers=[("x-forwarded-for", "198.51.100.2")])[0]["status"] == 200
+
+
+def test_client_ip_skips_trusted_hops_and_spoofed_prefix():
+    middleware = login_limiter(trusted_proxies=["10.0.0.0/8"])
+    scope = {"client": ("10.0.0.2", 1), "headers": [(b"x-forwarded-for", b"1.1.1.1, 198.51.100.7, 10.0.0.9")]}
+    assert middleware.client_ip(scope) == "198.51.100.7"
+    assert middleware.client_ip({"client": ("10.0.0.2", 1), "headers": []}) == "10.0.0.2"
+
+
+def gap_limiter():
+    policies = [
+        RateLimitPolicy("POST", "/api/analysis/gap", scope="user", rate=1 / 60, burst=2),
+        RateLimitPolicy("POST", "/api/analysis/gap", scope="global", rate=1 / 60, burst=3),
+    ]
+    # Stands in for JWT decoding: "Bearer user:<id>" is a valid token, anything else is not.
+    def user_key(header):
+        return header[len("Bearer user:"):] if header.startswith("Bearer user:") else None
+    return RateLimitMiddleware(ok_app, policies, user_key=user_key)
+
+
+def gap_call(middleware, token):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/analysis/gap", "client": ("203.0.113.5", 1),
+             "headers": [(b"authorization", f"Bearer {token}".encode())]}
+    asyncio.run(middleware(scope, None, send))
+    return sent[0]["status"]
+
+
+def test_unauthenticated_requests_do_not_spend_the_global_bucket(clock):
+    middleware = gap_limiter()
+    for _ in range(60):
+        gap_call(middleware, "garbage")
+    assert gap_call(middleware, "user:a") == 200
+
+
+def test_rejected_request_spends_no_tokens(clock):
+    middleware = gap_limiter()
+    assert [gap_call(middleware, "user:a") for _ in range(3)] == [200, 200, 429]
+    # a's rejected third request must not have used the global token left for b.
+    assert gap_call(middleware, "user:b") == 200
+    assert gap_call(middleware, "user:c") == 429
+
+
+def test_peek_and_refund(clock):
+    store = TokenBucketStore()
+    assert store.peek("k", rate=1, burst=1) == 0.0
+    store.take("k", rate=1, burst=1)
+    assert store.peek("k", rate=1, burst=1) == pytest.approx(1.0)
+    store.refund("k", burst=1)
+    assert store.take("k", rate=1, burst=1) == 0.0
+
+
+def test_exempt_requests_spend_no_tokens(clock):
+    async def exempt(scope):
+        return dict(scope["headers"]).get(b"idempotency-key") == b"known"
+
+    policy = RateLimitPolicy("POST", "/api/auth/login", scope="ip", rate=1 / 60, burst=1)
+    middleware = RateLimitMiddleware(ok_app, [policy], user_key=lambda header: None, exempt=exempt)
+    assert call(middleware)[0]["status"] == 200
+    assert call(middleware)[0]["status"] == 429
+    assert call(middleware, headers=[("idempotency-key", "known")])[0]["status"] == 200
+    assert call(middleware, headers=[("idempotency-key", "new")])[0]["status"] == 429
@@ -0,0 +1,73 @@
+import pytest
+
+from skill_taxonomy import BUILTIN_TAXONOMY, SkillTaxonomy, edit_distance, normalize
+
+
+@pytest.fixture(scope="module")
+def taxonomy():
+    return SkillTaxonomy(BUILTIN_TAXONOMY)
+
+
+@pytest.mark.parametrize("name, skill_id", [
+    ("JavaScript", "javascript"),
+    ("javascript ", "javascript"),
+    ("React.js", "react"),
+    ("Node.js", "nodejs"),
+    ("HTML/CSS", "html-css"),
+    ("ci-cd", "ci-cd"),
+])
+def test_exact_names(taxonomy, name, skill_id):
+    assert taxonomy.resolve(name) == skill_id
+
+
+@pytest.mark.parametrize("name, skill_id", [
+    ("JS", "javascript"),
+    ("ReactJS", "react"),
+    ("Postgres", "sql"),
+    ("K8s", "kubernetes"),
+    ("Pen Testing", "ethical-hacking"),
+    ("UI Design", "visual-design"),
+])
+def test_aliases(taxonomy, name, skill_id):
+    assert taxonomy.resolve(name) == skill_id
+
+
+@pytest.mark.parametrize("name, skill_id", [
+    ("Pyhton", "python"),
+    ("Javscript", "javascript"),
+    ("Kuberentes", "kubernetes"),
+    ("Dokcer", "docker"),
+    ("Postgress", "sql"),
+    ("Machine Lerning", "machine-learning"),
+    ("Cryptograpy", "cryptography"),
+])
+def test_typos(taxonomy, name, skill_id):
+    assert taxonomy.resolve(name) == skill_id
+
+
+@pytest.mark.parametrize("name", [
+    "Testing",
+    "Design",
+    "UX Design",
+    "UI/UX Design",
+    "Mongoose",
+    "Node Security",
+    "Web Security",
+    "Cloud Security",
+    "Redis",
+    "Java",
+    "Data Science",
+])
+def test_unrelated_names_do_not_match(taxonomy, name):
+    # Unknown skills resolve to themselves so they only ever match the same name.
+    assert taxonomy.resolve(name) == normalize(name)
+
+
+def test_resolve_all_deduplicates(taxonomy):
+    assert taxonomy.resolve_all(["React", "ReactJS", "Pyhton", "Rust"]) == ["react", "python", "rust"]
+
+
+def test_edit_distance_counts_transpositions_once():
+    assert edit_distance("python", "pyhton", 2) == 1
+    assert edit_distance("kitten", "sitting", 5) == 3
+    assert edit_distance("kitten", "sitting", 1) == 2